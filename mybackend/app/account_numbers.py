@@ -0,0 +1,121 @@
+import os
+import threading
+
+from django.db import connection, transaction
+from .models import AccountNumberSequence, CustomUser
+
+# Serials are reserved BLOCK_SIZE at a time; PostgreSQL hands blocks out
+# from SEQUENCE_NAME (created in migration 0013), other databases from the
+# AccountNumberSequence row.
+BLOCK_SIZE = 100
+FIRST_SERIAL = 100000000
+SEQUENCE_NAME = 'app_account_number_seq'
+LOOKUP_CHUNK_SIZE = 1000
+
+
+def luhn_check_digit(digits):
+    total = 0
+    for index, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if index % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def is_valid_account_number(number):
+    return (
+        len(number) == 10
+        and number.isdigit()
+        and luhn_check_digit(number[:-1]) == number[-1]
+    )
+
+
+def format_account_number(serial):
+    digits = f"{serial:09d}"
+    return digits + luhn_check_digit(digits)
+
+
+class AccountNumberAllocator:
+    """
+    Hands out account numbers from blocks reserved in the database.
+
+    Reserving a block costs one query for the counter and one to skip numbers
+    already taken by legacy (randomly generated) accounts; numbers within a
+    block are then handed out from memory.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._numbers = []
+        self._pid = os.getpid()
+
+    def allocate(self):
+        return self.allocate_many(1)[0]
+
+    def allocate_many(self, count):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: the parent may hand out the same cached numbers
+                self._numbers = []
+                self._pid = os.getpid()
+            while len(self._numbers) < count:
+                missing = count - len(self._numbers)
+                reserved = self._reserve_blocks(-(-missing // BLOCK_SIZE))
+                if connection.vendor != 'postgresql' and connection.in_atomic_block:
+                    # The counter row update rolls back with the caller's
+                    # transaction, so the rest of the block is only ours once
+                    # that commits
+                    self._numbers.extend(reserved[:missing])
+                    transaction.on_commit(lambda leftovers=reserved[missing:]: self._keep(leftovers))
+                else:
+                    self._numbers.extend(reserved)
+            numbers, self._numbers = self._numbers[:count], self._numbers[count:]
+        return numbers
+
+    def _keep(self, numbers):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._numbers.extend(numbers)
+
+    def assign(self, users):
+        """Fill in account numbers for users about to be passed to bulk_create."""
+        missing = [user for user in users if not user.account_number]
+        for user, number in zip(missing, self.allocate_many(len(missing))):
+            user.account_number = number
+        return users
+
+    def _reserve_blocks(self, blocks):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT nextval(%s) FROM generate_series(1, %s)', [SEQUENCE_NAME, blocks]
+                )
+                starts = [row[0] for row in cursor.fetchall()]
+        else:
+            with transaction.atomic():
+                sequence, _ = AccountNumberSequence.objects.select_for_update().get_or_create(
+                    pk=1, defaults={'next_serial': FIRST_SERIAL}
+                )
+                start = sequence.next_serial
+                sequence.next_serial += blocks * BLOCK_SIZE
+                sequence.save(update_fields=['next_serial'])
+            starts = range(start, start + blocks * BLOCK_SIZE, BLOCK_SIZE)
+
+        numbers = [
+            format_account_number(serial)
+            for start in starts
+            for serial in range(start, start + BLOCK_SIZE)
+        ]
+        taken = set()
+        for offset in range(0, len(numbers), LOOKUP_CHUNK_SIZE):
+            chunk = numbers[offset:offset + LOOKUP_CHUNK_SIZE]
+            taken.update(
+                CustomUser.objects.filter(account_number__in=chunk).values_list('account_number', flat=True)
+            )
+        return [number for number in numbers if number not in taken]
+
+
+allocator = AccountNumberAllocator()
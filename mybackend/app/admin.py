@@ -1,9 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils import timezone
 from django.utils.html import format_html
-from django.db.models import Sum
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
 from .models import CustomUser, Transaction
+from .pagination import EstimatedCountPaginator
+from . import services
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -12,6 +22,8 @@ class CustomUserAdmin(UserAdmin):
     search_fields = ('email', 'username', 'phone_number', 'account_number')
     ordering = ('-date_joined',)
     actions = ['approve_users', 'reject_users']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ('account_number', 'created_at', 'updated_at')
     
     fieldsets = (
@@ -79,8 +91,77 @@ class TransactionAdmin(admin.ModelAdmin):
     list_filter = ('transaction_type', 'status', 'created_at')
     search_fields = ('user__email', 'recipient_email', 'description')
     readonly_fields = ('created_at',)
-    actions = ['approve_transactions', 'reject_transactions']
-    
+    actions = ['approve_transactions', 'queue_transactions', 'reject_transactions']
+    # The user/processed_by columns and each row's checkbox label (Transaction.__str__) need these
+    list_select_related = ('user', 'processed_by')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    change_list_template = 'admin/app/transaction/change_list.html'
+    report_days = 30
+
+    def get_urls(self):
+        return [
+            path('reports/', self.admin_site.admin_view(self.reports_view), name='app_transaction_reports'),
+        ] + super().get_urls()
+
+    def cached_panel(self, name, build):
+        key = f'admin-reports:{name}'
+        panel = cache.get(key)
+        if panel is None:
+            panel = build()
+            cache.set(key, panel, settings.ADMIN_REPORTS_CACHE_TIMEOUT)
+        return panel
+
+    def summary_panel(self):
+        totals = Transaction.objects.aggregate(
+            approved_deposits=Sum('amount', filter=Q(transaction_type='deposit', status='approved'), default=0),
+            approved_loans=Sum('amount', filter=Q(transaction_type='loan', status='approved'), default=0),
+            pending_transfers=Sum('amount', filter=Q(transaction_type='transfer', status='pending'), default=0),
+            pending_count=Count('id', filter=Q(status='pending')),
+        )
+        totals.update(CustomUser.objects.aggregate(
+            outstanding_loans=Sum('loan_balance', default=0),
+            total_balances=Sum('balance', default=0),
+        ))
+        return totals
+
+    def daily_panel(self):
+        since = timezone.now() - timedelta(days=self.report_days)
+        return list(
+            Transaction.objects.filter(created_at__gte=since)
+            .annotate(day=TruncDate('created_at'))
+            .values('day')
+            .annotate(
+                deposits=Sum('amount', filter=Q(transaction_type='deposit'), default=0),
+                transfers=Sum('amount', filter=Q(transaction_type='transfer'), default=0),
+                loans=Sum('amount', filter=Q(transaction_type='loan'), default=0),
+                count=Count('id'),
+            )
+            .order_by('-day')
+        )
+
+    def breakdown_panel(self):
+        return list(
+            Transaction.objects.values('transaction_type', 'status')
+            .annotate(count=Count('id'), total=Sum('amount'))
+            .order_by('transaction_type', 'status')
+        )
+
+    def reports_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title='Transaction reports',
+            report_days=self.report_days,
+            summary=self.cached_panel('summary', self.summary_panel),
+            daily=self.cached_panel('daily', self.daily_panel),
+            breakdown=self.cached_panel('breakdown', self.breakdown_panel),
+        )
+        return TemplateResponse(request, 'admin/app/transaction/reports.html', context)
+
     def get_transaction_type(self, obj):
         return obj.get_transaction_type_display()
     get_transaction_type.short_description = 'Type'
@@ -90,23 +171,21 @@ class TransactionAdmin(admin.ModelAdmin):
     get_status.short_description = 'Status'
 
     def approve_transactions(self, request, queryset):
-        success_count = 0
-        error_count = 0
-        for transaction in queryset:
-            if transaction.status == 'pending':
-                try:
-                    transaction.approve(request.user)
-                    success_count += 1
-                except ValueError as e:
-                    error_count += 1
-                    self.message_user(request, f"Error approving transaction {transaction.id}: {str(e)}", level='error')
-        
-        if success_count > 0:
-            self.message_user(request, f"{success_count} transactions were successfully approved.")
-        if error_count > 0:
-            self.message_user(request, f"{error_count} transactions failed to approve.", level='warning')
+        approved, errors = services.approve_transactions(queryset, request.user)
+        for transaction, message in errors:
+            self.message_user(request, f"Error approving transaction {transaction.id}: {message}", level='error')
+
+        if approved:
+            self.message_user(request, f"{len(approved)} transactions were successfully approved.")
+        if errors:
+            self.message_user(request, f"{len(errors)} transactions failed to approve.", level='warning')
     approve_transactions.short_description = "Approve selected transactions"
 
+    def queue_transactions(self, request, queryset):
+        queued = queryset.filter(status='pending').update(queued_at=timezone.now(), queued_by=request.user)
+        self.message_user(request, f"{queued} transactions were queued for approval by the process_transactions worker.")
+    queue_transactions.short_description = "Approve selected transactions in the background"
+
     def reject_transactions(self, request, queryset):
         success_count = 0
         error_count = 0
@@ -0,0 +1,174 @@
+"""
+Async-native versions of the read-only endpoints, for ASGI deployments.
+
+They are plain Django async views rather than DRF views (DRF does not run
+handlers on the event loop), but authenticate, authorize, paginate and
+serialize exactly like their counterparts in views.py, so responses are
+identical. Under WSGI they still work, one request per worker thread.
+"""
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from . import events
+from .authentication import CachedJWTAuthentication
+from .models import CustomUser, Transaction
+from .pagination import TransactionCursorPagination
+from .permissions import IsApprovedAccount
+from .renderers import FastJSONRenderer
+from .serializers import CompactTransactionSerializer, TransactionSerializer, UserProfileSerializer
+
+
+class AsyncAPIView(View):
+    """Runs JWT authentication and IsApprovedAccount without leaving the event loop."""
+    http_method_names = ['get', 'head', 'options']
+    authentication = CachedJWTAuthentication()
+    permission = IsApprovedAccount()
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request = Request(request)
+        try:
+            await self.authenticate(self.request)
+        except exceptions.APIException as exc:
+            response = self.render_exception(exc)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+            return response
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404 as exc:
+            return self.render({'detail': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+
+    def get_raw_token(self, request):
+        header = self.authentication.get_header(request)
+        return self.authentication.get_raw_token(header) if header else None
+
+    async def get_token(self, request):
+        raw_token = self.get_raw_token(request)
+        if raw_token is None:
+            raise exceptions.NotAuthenticated()
+        return self.authentication.get_validated_token(raw_token)
+
+    async def authenticate(self, request):
+        token = await self.get_token(request)
+        request.user = await self.authentication.aget_user(token)
+        request.auth = token
+        if not await self.permission.ahas_permission(request, self):
+            raise exceptions.PermissionDenied(self.permission.message)
+
+    def render_exception(self, exc):
+        # Same body DRF's exception handler produces
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return self.render(data, status=exc.status_code)
+
+    def render(self, data, status=status.HTTP_200_OK):
+        return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+class AsyncUserProfileView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        return self.render(UserProfileSerializer(self.request.user).data)
+
+
+class AsyncTransactionListView(AsyncAPIView):
+    pagination_class = TransactionCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        queryset = Transaction.objects.filter(user=self.request.user)
+        serialize = lambda rows: TransactionSerializer(rows, many=True).data
+        if CompactTransactionSerializer.requested(self.request):
+            queryset = CompactTransactionSerializer.values(queryset)
+            serialize = lambda rows: CompactTransactionSerializer(rows).data
+
+        paginator = self.pagination_class()
+        try:
+            page = await paginator.apaginate_queryset(queryset, self.request, view=self)
+        except exceptions.NotFound as exc:
+            return self.render_exception(exc)
+        if page is not None:
+            return self.render(paginator.get_paginated_response(serialize(page)).data)
+        return self.render(serialize([row async for row in queryset]))
+
+
+class AsyncTransactionDetailView(AsyncAPIView):
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            transaction = await Transaction.objects.aget(pk=pk, user=self.request.user)
+        except Transaction.DoesNotExist:
+            raise Http404('No Transaction matches the given query.')
+        return self.render(TransactionSerializer(transaction).data)
+
+
+class TransactionEventsView(AsyncAPIView):
+    """
+    Server-sent events: one ``transaction`` event, shaped like the list
+    endpoint's items, whenever one of the user's transactions is approved,
+    rejected or received. Needs ASGI, since the connection stays open.
+
+    Browsers' EventSource cannot send headers, so instead of the access token
+    the stream also accepts ``?ticket=`` from TransactionEventsTicketView.
+    The stream ends with an ``expired`` event when the access token behind it
+    expires, and silently once the account is no longer approved or its
+    tokens were revoked (checked every heartbeat interval).
+    """
+
+    async def get_token(self, request):
+        ticket = request.query_params.get('ticket')
+        if ticket is None or self.get_raw_token(request) is not None:
+            return await super().get_token(request)
+        claims = await events.aredeem_ticket(ticket)
+        if claims is None:
+            raise exceptions.AuthenticationFailed('Stream ticket is invalid, expired or already used')
+        return claims
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return self.render({
+                'status': 'error',
+                'message': 'The event stream is only available when the API is served over ASGI'
+            }, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        # Subscribe before responding so nothing published from here on is missed
+        subscription = await events.get_backend().subscribe(events.user_channel(self.request.user.pk))
+        response = StreamingHttpResponse(self.stream(subscription), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def still_authorized(self):
+        try:
+            self.request.user = await CustomUser.objects.aget(pk=self.request.user.pk)
+        except CustomUser.DoesNotExist:
+            return False
+        return self.request.user.is_active and await self.permission.ahas_permission(self.request, self)
+
+    async def stream(self, subscription):
+        heartbeat = settings.SSE_HEARTBEAT_INTERVAL
+        expires_at = self.request.auth['exp']
+        checked_at = time.monotonic()
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield 'event: expired\ndata: {}\n\n'
+                    return
+                if time.monotonic() - checked_at >= heartbeat:
+                    if not await self.still_authorized():
+                        return
+                    checked_at = time.monotonic()
+                try:
+                    message = await subscription.get(min(heartbeat, remaining))
+                except events.SubscriptionOverflow:
+                    return
+                if message is None:
+                    # Keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                else:
+                    yield f'event: transaction\ndata: {message}\n\n'
+        finally:
+            await subscription.close()
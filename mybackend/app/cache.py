@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+AUTH_USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 30)
+
+
+def dashboard_cache_key(user_id):
+    return f'dashboard:{user_id}'
+
+
+def auth_user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def _delete_on_commit(keys):
+    if keys:
+        # Deleting before commit would let a concurrent request re-cache the old rows
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_user(*user_ids):
+    """Drop the cached authenticated user and dashboard once the current transaction commits."""
+    _delete_on_commit([
+        key
+        for user_id in user_ids if user_id
+        for key in (auth_user_cache_key(user_id), dashboard_cache_key(user_id))
+    ])
+
+
+def invalidate_dashboard(*user_ids):
+    """Drop cached dashboards once the current transaction commits."""
+    _delete_on_commit([dashboard_cache_key(user_id) for user_id in user_ids if user_id])
@@ -0,0 +1,36 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET/HEAD with 304 Not Modified, before anything is serialized,
+    while the client's If-None-Match / If-Modified-Since still match.
+
+    Views implement ``get_last_modified(request)``; the ETag is derived from
+    it, the user and the full path (query parameters change the body).
+    """
+
+    def get_last_modified(self, request):
+        raise NotImplementedError('.get_last_modified() must be overridden')
+
+    def get(self, request, *args, **kwargs):
+        last_modified = self.get_last_modified(request)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        etag = quote_etag(hashlib.md5(
+            f'{request.user.pk}|{last_modified.isoformat() if last_modified else ""}|{request.get_full_path()}'.encode()
+        ).hexdigest())
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Authorization'])
+        return response
@@ -0,0 +1,190 @@
+"""
+Per-user transaction events for the server-sent events stream.
+
+``publish_transactions`` is called wherever a transaction changes status and
+hands the serialized rows to the configured backend once the database
+transaction commits. ``EVENTS_BACKEND`` picks the backend: ``LocalBackend``
+fans out within the current process (development, tests, single-process
+deployments), ``RedisBackend`` goes through Redis pub/sub so that approvals
+made in the admin or the process_transactions worker reach every web worker.
+
+Browsers' EventSource cannot send an Authorization header, so clients trade
+their access token for a stream ticket (``issue_ticket``): signed, valid for
+``SSE_TICKET_MAX_AGE`` seconds, good for one stream and nothing else, so the
+URLs that end up in access logs carry no reusable credential.
+"""
+import asyncio
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+TICKET_SALT = 'app.events.ticket'
+
+
+def user_channel(user_id):
+    return f'transactions:{user_id}'
+
+
+def issue_ticket(claims):
+    """A stream ticket carrying the access token's user, expiry, status and token version."""
+    return signing.dumps(claims, salt=TICKET_SALT, compress=True)
+
+
+async def aredeem_ticket(ticket):
+    """
+    The claims of a stream ticket, or None if it is forged, expired or was
+    already used (as far as the cache can tell: use a shared cache across workers).
+    """
+    max_age = getattr(settings, 'SSE_TICKET_MAX_AGE', 30)
+    try:
+        claims = signing.loads(ticket, salt=TICKET_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return None
+    if not await cache.aadd(f'sse-ticket:{hashlib.sha256(ticket.encode()).hexdigest()}', True, max_age):
+        return None
+    return claims
+
+
+class SubscriptionOverflow(Exception):
+    """The subscriber fell more than ``SSE_QUEUE_SIZE`` messages behind."""
+
+
+class LocalSubscription:
+    def __init__(self, backend, channel):
+        self.backend = backend
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=getattr(settings, 'SSE_QUEUE_SIZE', 100))
+        self.overflowed = False
+
+    def put(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._offer, message)
+        except RuntimeError:
+            # The subscriber's event loop is gone
+            pass
+
+    def _offer(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Stop buffering for a client that is not reading; it has to reconnect and resync
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Next message on the channel, or None after ``timeout`` seconds without one."""
+        if self.overflowed:
+            raise SubscriptionOverflow()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.backend.unsubscribe(self)
+
+
+class LocalBackend:
+    """In-process pub/sub; publishers may run on any thread."""
+
+    def __init__(self, location=''):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    async def subscribe(self, channel):
+        subscription = LocalSubscription(self, channel)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.channel, None)
+
+
+class RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return message['data'].decode()
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBackend:
+    """Redis pub/sub, for deployments with more than one process. Requires the ``redis`` package."""
+
+    def __init__(self, location=''):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError:
+            raise ImproperlyConfigured('RedisBackend requires the redis package (pip install redis)')
+        self.redis = redis
+        self.location = location or 'redis://localhost:6379/0'
+        self.client = redis.Redis.from_url(self.location)
+
+    def publish(self, channel, message):
+        self.client.publish(channel, message)
+
+    async def subscribe(self, channel):
+        client = self.redis.asyncio.Redis.from_url(self.location)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        return RedisSubscription(client, pubsub)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = import_string(getattr(settings, 'EVENTS_BACKEND', 'app.events.LocalBackend'))
+                _backend = backend_class(getattr(settings, 'EVENTS_LOCATION', ''))
+    return _backend
+
+
+def publish_transactions(transactions):
+    """Push each transaction to its owner's stream once the current database transaction commits."""
+    transactions = list(transactions)
+    if not transactions:
+        return
+
+    def send():
+        from .renderers import FastJSONRenderer
+        from .serializers import TransactionSerializer
+
+        # Serialized here, off the locked section, and in one pass over the batch
+        renderer = FastJSONRenderer()
+        backend = get_backend()
+        for txn, data in zip(transactions, TransactionSerializer(transactions, many=True).data):
+            backend.publish(user_channel(txn.user_id), renderer.render(data).decode())
+
+    # A broker outage must not undo or fail an approval that already committed
+    transaction.on_commit(send, robust=True)
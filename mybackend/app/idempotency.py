@@ -0,0 +1,85 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+class _Discard(Exception):
+    """Raised to roll back the reserved key when the wrapped view did not succeed."""
+    def __init__(self, response):
+        self.response = response
+
+
+class IdempotencyMixin:
+    """
+    Honors an ``Idempotency-Key`` header on POST.
+
+    The first successful response for a key is stored and replayed verbatim
+    for retries, without running the serializer again. Failed responses are
+    not stored, so the client may retry them with the same key.
+    """
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().post(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({
+                'status': 'error',
+                'message': f'{IDEMPOTENCY_HEADER} must be at most 255 characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        request_hash = hashlib.sha256(
+            json.dumps(request.data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        now = timezone.now()
+
+        existing = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if existing is not None:
+            if existing.expires_at > now:
+                return self.replay(existing, request, request_hash)
+            existing.delete()
+
+        try:
+            with transaction.atomic():
+                # Reserving the key first makes a concurrent retry wait on the unique constraint
+                record = IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=key,
+                    path=request.path,
+                    request_hash=request_hash,
+                    expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+                )
+                response = super().post(request, *args, **kwargs)
+                if not status.is_success(response.status_code):
+                    raise _Discard(response)
+                record.response_status = response.status_code
+                record.response_body = response.data
+                record.save(update_fields=['response_status', 'response_body'])
+        except _Discard as discarded:
+            return discarded.response
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+            if existing is None:
+                raise
+            return self.replay(existing, request, request_hash)
+        return response
+
+    def replay(self, record, request, request_hash):
+        if record.path != request.path or record.request_hash != request_hash:
+            return Response({
+                'status': 'error',
+                'message': f'{IDEMPOTENCY_HEADER} was already used for a different request'
+            }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response(
+            record.response_body,
+            status=record.response_status,
+            headers={'Idempotent-Replayed': 'true'},
+        )
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.db.models import Max, OuterRef, Subquery, Sum
+from .models import BalanceSnapshot, CustomUser, LedgerEntry
+
+
+def _totals(entries):
+    totals = {'balance': Decimal('0'), 'loan': Decimal('0')}
+    for row in entries.values('account').annotate(total=Sum('amount')):
+        if row['account'] in totals:
+            totals[row['account']] = row['total']
+    return totals
+
+
+def balance_at(user, when):
+    """
+    Return ``(balance, loan_balance)`` for ``user`` as of ``when``.
+
+    Starts from the newest snapshot taken at or before ``when`` and only sums
+    the ledger entries written after it.
+    """
+    snapshot = BalanceSnapshot.objects.filter(user=user, taken_at__lte=when).first()
+    entries = LedgerEntry.objects.filter(user=user, created_at__lte=when)
+    balance = loan_balance = Decimal('0')
+    if snapshot:
+        entries = entries.filter(created_at__gt=snapshot.taken_at)
+        balance, loan_balance = snapshot.balance, snapshot.loan_balance
+    totals = _totals(entries)
+    return balance + totals['balance'], loan_balance - totals['loan']
+
+
+def take_snapshots(taken_at, chunk_size=1000):
+    """
+    Snapshot every account with ledger activity since the previous run.
+
+    Each new snapshot is the account's previous snapshot plus the entries
+    written in between, so a run only reads the window since the last one.
+    """
+    since = BalanceSnapshot.objects.aggregate(last=Max('taken_at'))['last']
+    window = LedgerEntry.objects.filter(created_at__lte=taken_at)
+    if since:
+        window = window.filter(created_at__gt=since)
+
+    active = window.values_list('user_id', flat=True).distinct().order_by('user_id')
+    previous = BalanceSnapshot.objects.filter(user=OuterRef('pk'), taken_at__lte=since or taken_at)
+    created = 0
+    user_ids = list(active)
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        accounts = CustomUser.objects.filter(pk__in=chunk).annotate(
+            prev_balance=Subquery(previous.values('balance')[:1]),
+            prev_loan_balance=Subquery(previous.values('loan_balance')[:1]),
+        ).values_list('pk', 'prev_balance', 'prev_loan_balance')
+        deltas = {}
+        for row in window.filter(user_id__in=chunk).values('user_id', 'account').annotate(total=Sum('amount')):
+            deltas[(row['user_id'], row['account'])] = row['total']
+
+        snapshots = [
+            BalanceSnapshot(
+                user_id=pk,
+                taken_at=taken_at,
+                balance=(prev_balance or 0) + deltas.get((pk, 'balance'), 0),
+                loan_balance=(prev_loan_balance or 0) - deltas.get((pk, 'loan'), 0),
+            )
+            for pk, prev_balance, prev_loan_balance in accounts
+        ]
+        BalanceSnapshot.objects.bulk_create(snapshots)
+        created += len(snapshots)
+    return created
@@ -0,0 +1,51 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from app.account_numbers import allocator
+from app.models import CustomUser
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Bulk-creates users with allocated account numbers and reports throughput (rolled back unless --keep)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--keep', action='store_true', help='Commit the created users')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        batch_size = options['batch_size']
+        password = make_password(None)
+        prefix = f'bench{int(time.time())}'
+
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+                for offset in range(0, count, batch_size):
+                    users = [
+                        CustomUser(
+                            username=f'{prefix}-{n}',
+                            email=f'{prefix}-{n}@example.com',
+                            password=password,
+                        )
+                        for n in range(offset, min(offset + batch_size, count))
+                    ]
+                    CustomUser.objects.bulk_create(allocator.assign(users))
+                elapsed = time.perf_counter() - started
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {count} users in {elapsed:.2f}s ({count / elapsed:,.0f} users/s, '
+            f'{len(queries.captured_queries)} queries)'
+        ))
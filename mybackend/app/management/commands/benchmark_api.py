@@ -0,0 +1,270 @@
+import json
+import platform
+import random
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from app.account_numbers import allocator
+from app.authentication import CachedJWTAuthentication
+from app.models import CustomUser, Transaction
+from app.throttling import RATE_LIMIT_THROTTLES
+from app.tokens import AccountRefreshToken
+from app.views import UserLoginView
+
+PASSWORD = 'benchmark-password'
+METRICS = ('p50_ms', 'p90_ms', 'p99_ms', 'mean_ms', 'queries_mean')
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway test database and measures latency percentiles and query counts '
+        'for the main API endpoints, printing a JSON report that can be compared between commits'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--transactions', type=int, default=50, help='Transactions seeded per user')
+        parser.add_argument('--iterations', type=int, default=50, help='Requests per scenario')
+        parser.add_argument('--approval-batch', type=int, default=500, help='Transactions per admin bulk approval')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--compare', help='Previous JSON report to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Relative slowdown in --compare that counts as a regression')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.verbosity = options['verbosity']
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            cache.clear()
+            self.seed(options['users'], options['transactions'])
+            # Every request comes from one address; the limiter is measured on its own
+            with override_settings(RATE_LIMIT_ENABLED=False):
+                scenarios = self.run_scenarios(options)
+            scenarios['rate_limit_check'] = self.measure_rate_limiter(options['iterations'] * 20)
+            report = {
+                'meta': {
+                    'database': connection.vendor,
+                    'python': platform.python_version(),
+                    'users': options['users'],
+                    'transactions_per_user': options['transactions'],
+                    'iterations': options['iterations'],
+                },
+                'scenarios': scenarios,
+            }
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.compare(report, options['compare'], options['threshold'])
+
+    def seed(self, user_count, transactions_per_user):
+        password = make_password(PASSWORD)
+        users = allocator.assign([
+            CustomUser(
+                username=f'bench{n}',
+                email=f'bench{n}@example.com',
+                password=password,
+                status=CustomUser.AccountStatus.APPROVED,
+                balance=Decimal('1000000.00'),
+            )
+            for n in range(user_count)
+        ])
+        CustomUser.objects.bulk_create(users, batch_size=1000)
+        self.users = list(CustomUser.objects.order_by('pk'))
+        self.admin = CustomUser.objects.create_superuser(
+            email='bench-admin@example.com', username='bench-admin', password=PASSWORD
+        )
+
+        types = ('deposit', 'transfer', 'loan')
+        statuses = ('pending', 'approved', 'rejected')
+        rows = []
+        for user in self.users:
+            for _ in range(transactions_per_user):
+                rows.append(Transaction(
+                    user=user,
+                    amount=Decimal(random.randint(1, 50000)) / 100,
+                    transaction_type=random.choice(types),
+                    status=random.choice(statuses),
+                    recipient_email=random.choice(self.users).email,
+                ))
+            if len(rows) >= 5000:
+                Transaction.objects.bulk_create(rows)
+                rows = []
+        Transaction.objects.bulk_create(rows)
+
+    def api_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccountRefreshToken.for_user(user).access_token}')
+        return client
+
+    def measure(self, iterations, request):
+        latencies = []
+        queries = []
+        for index in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request(index)
+                latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f'Benchmark request failed with {response.status_code}: {response.content[:200]!r}')
+            queries.append(len(captured.captured_queries))
+        return {
+            'requests': iterations,
+            'requests_per_sec': round(iterations / (sum(latencies) / 1000), 1),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p90_ms': round(percentile(latencies, 0.90), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'max_ms': round(max(latencies), 3),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+        }
+
+    def measure_rate_limiter(self, iterations):
+        """Time the login throttles against the configured cache, with limits too high to trip."""
+        view = UserLoginView()
+        view.throttle_scope = 'benchmark'
+        throttles = [throttle() for throttle in RATE_LIMIT_THROTTLES]
+        factory = APIRequestFactory()
+        requests = [
+            view.initialize_request(factory.post('/', {'email': f'bench{n}@example.com'}, format='json'))
+            for n in range(100)
+        ]
+        for request in requests:
+            # Parse and authenticate up front so only the throttles are timed
+            request.data, request.user
+
+        latencies = []
+        limits = {'benchmark': {'ip': '1000000/s', 'account': '1000000/s', 'endpoint': '1000000/s'}}
+        with override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMITS=limits):
+            for index in range(iterations):
+                request = requests[index % len(requests)]
+                started = time.perf_counter()
+                for throttle in throttles:
+                    if not throttle.allow_request(request, view):
+                        raise CommandError('Rate limiter rejected a benchmark request')
+                latencies.append((time.perf_counter() - started) * 1000)
+        return {
+            'requests': iterations,
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p90_ms': round(percentile(latencies, 0.90), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'max_ms': round(max(latencies), 3),
+        }
+
+    def measure_auth_cache(self, iterations, clients):
+        """The profile endpoint with CachedJWTAuthentication's user cache bypassed, then warm."""
+        profile = reverse('profile')
+        request = lambda i: clients[i % len(clients)].get(profile)
+        cache.clear()
+        with mock.patch.object(CachedJWTAuthentication, 'get_user', JWTAuthentication.get_user):
+            off = self.measure(iterations, request)
+        for client in clients:
+            client.get(profile)
+        on = self.measure(iterations, request)
+        return off, on
+
+    def run_scenarios(self, options):
+        iterations = options['iterations']
+        users = self.users
+        clients = [self.api_client(user) for user in users[:iterations]]
+        pick = lambda index: clients[index % len(clients)]
+
+        scenarios = {}
+        scenarios['login'] = self.measure(iterations, lambda i: APIClient().post(
+            reverse('login'), {'email': users[i % len(users)].email, 'password': PASSWORD}, format='json'
+        ))
+        scenarios['profile'] = self.measure(iterations, lambda i: pick(i).get(reverse('profile')))
+        # A handful of clients, so repeat requests find their user in the cache
+        scenarios['profile_auth_cache_off'], scenarios['profile_auth_cache_on'] = self.measure_auth_cache(
+            iterations, clients[:10]
+        )
+        scenarios['transaction_list'] = self.measure(iterations, lambda i: pick(i).get(reverse('transaction-list')))
+        scenarios['transaction_list_page'] = self.measure(
+            iterations, lambda i: pick(i).get(reverse('transaction-list'), {'page_size': 20})
+        )
+        scenarios['dashboard'] = self.measure(iterations, lambda i: pick(i).get(reverse('dashboard')))
+        scenarios['deposit'] = self.measure(iterations, lambda i: pick(i).post(
+            reverse('deposit'), {'amount': '10.00', 'description': 'benchmark'}, format='json'
+        ))
+        scenarios['transfer'] = self.measure(iterations, lambda i: pick(i).post(
+            reverse('transfer'),
+            {'amount': '1.00', 'recipient_account_number': users[(i + 1) % len(users)].account_number},
+            format='json',
+        ))
+
+        admin_client = Client()
+        admin_client.force_login(self.admin)
+        changelist = reverse('admin:app_transaction_changelist')
+
+        batch_size = options['approval_batch']
+        pending = list(
+            Transaction.objects.filter(status='pending', transaction_type='deposit').values_list('pk', flat=True)
+        )
+
+        def approve_batch(index):
+            return admin_client.post(changelist, {
+                'action': 'approve_transactions',
+                '_selected_action': pending[index * batch_size:(index + 1) * batch_size],
+            })
+
+        scenarios['admin_bulk_approval'] = self.measure(max(1, iterations // 10), approve_batch)
+        scenarios['admin_bulk_approval']['batch_size'] = options['approval_batch']
+        return scenarios
+
+    def compare(self, report, baseline_path, threshold):
+        with open(baseline_path) as handle:
+            baseline = json.load(handle)
+
+        regressions = []
+        for name, current in report['scenarios'].items():
+            previous = baseline.get('scenarios', {}).get(name)
+            if not previous:
+                continue
+            for metric in METRICS:
+                before, after = previous.get(metric), current.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                line = f'{name}.{metric}: {before} -> {after} ({change:+.1%})'
+                if change > threshold:
+                    regressions.append(line)
+                    self.stderr.write(self.style.ERROR(line))
+                elif self.verbosity > 1:
+                    self.stderr.write(line)
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} metric(s) regressed by more than {threshold:.0%}')
+        self.stderr.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from app.management.commands.benchmark_api import percentile
+from app.models import CustomUser
+from app.tokens import AccountRefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        'Opens many concurrent connections against a running server and reports throughput and '
+        'latency per concurrency level. Run it against the same endpoint served by gunicorn (WSGI) '
+        'and by an ASGI server, e.g. /api/auth/transactions/ vs /api/async/auth/transactions/'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Full URL to request, e.g. http://127.0.0.1:8000/api/async/auth/profile/')
+        parser.add_argument('--email', help='Mint an access token for this user (must exist in the configured database)')
+        parser.add_argument('--token', help='Access token to send instead of --email')
+        parser.add_argument('--concurrency', default='10,50,200', help='Comma-separated connection counts')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency level')
+        parser.add_argument('--slow-client', type=float, default=0.0,
+                            help='Seconds each client waits between sending the request line and the headers')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        token = options['token']
+        if options['email']:
+            try:
+                user = CustomUser.objects.get(email=options['email'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"No user with email {options['email']}")
+            token = str(AccountRefreshToken.for_user(user).access_token)
+
+        url = urlsplit(options['url'])
+        if url.scheme not in ('http', 'https'):
+            raise CommandError('url must start with http:// or https://')
+        levels = [int(level) for level in options['concurrency'].split(',') if level]
+
+        report = {
+            'meta': {'url': options['url'], 'duration': options['duration'], 'slow_client': options['slow_client']},
+            'levels': {},
+        }
+        for level in levels:
+            report['levels'][str(level)] = asyncio.run(self.run_level(url, token, level, options))
+            if options['verbosity'] > 1:
+                self.stderr.write(f"{level} connections: {report['levels'][str(level)]}")
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    async def run_level(self, url, token, concurrency, options):
+        deadline = time.monotonic() + options['duration']
+        latencies = []
+        errors = {}
+
+        async def client():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(
+                        self.request(url, token, options['slow_client']), options['timeout']
+                    )
+                except (OSError, asyncio.TimeoutError, ValueError, IndexError) as exc:
+                    status = type(exc).__name__
+                if status == 200:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+        result = {
+            'requests': len(latencies),
+            'errors': errors,
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+        }
+        if latencies:
+            result.update({
+                'p50_ms': round(percentile(latencies, 0.50), 3),
+                'p90_ms': round(percentile(latencies, 0.90), 3),
+                'p99_ms': round(percentile(latencies, 0.99), 3),
+                'max_ms': round(max(latencies), 3),
+            })
+        return result
+
+    async def request(self, url, token, slow_client):
+        port = url.port or (443 if url.scheme == 'https' else 80)
+        reader, writer = await asyncio.open_connection(url.hostname, port, ssl=url.scheme == 'https')
+        try:
+            path = url.path or '/'
+            if url.query:
+                path = f'{path}?{url.query}'
+            writer.write(f'GET {path} HTTP/1.1\r\n'.encode())
+            if slow_client:
+                await writer.drain()
+                await asyncio.sleep(slow_client)
+            headers = [f'Host: {url.netloc}', 'Connection: close', 'Accept: application/json']
+            if token:
+                headers.append(f'Authorization: Bearer {token}')
+            writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode())
+            await writer.drain()
+
+            status_line = await reader.readline()
+            await reader.read()
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
@@ -0,0 +1,72 @@
+import gzip
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+from app.management.commands.benchmark_serializers import Command as SerializerBenchmark
+from app.middleware import brotli
+from app.models import Transaction
+from app.renderers import FastJSONRenderer, orjson
+from app.serializers import TransactionSerializer
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 2), result
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway test database and measures JSON rendering and response compression '
+        'for a large transaction history payload'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the best one is reported')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            user = SerializerBenchmark().seed(options['rows'])
+            data = TransactionSerializer(Transaction.objects.filter(user=user), many=True).data
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        repeat = options['repeat']
+        stock_ms, body = best_of(repeat, lambda: JSONRenderer().render(data))
+        fast_ms, fast_body = best_of(repeat, lambda: FastJSONRenderer().render(data))
+        report = {
+            'rows': options['rows'],
+            'render': {
+                'encoder': 'orjson' if orjson is not None else 'json',
+                'jsonrenderer_ms': stock_ms,
+                'fastjsonrenderer_ms': fast_ms,
+                'identical_output': body == fast_body,
+            },
+            'compression': {'identity': {'bytes': len(body)}},
+        }
+
+        gzip_ms, compressed = best_of(
+            repeat, lambda: gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+        )
+        report['compression']['gzip'] = {'bytes': len(compressed), 'ms': gzip_ms}
+        if brotli is not None:
+            brotli_ms, compressed = best_of(
+                repeat, lambda: brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            )
+            report['compression']['br'] = {'bytes': len(compressed), 'ms': brotli_ms}
+
+        self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,79 @@
+import json
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from app.models import CustomUser, Transaction
+from app.serializers import CompactTransactionSerializer, TransactionSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway test database and compares rows/sec of TransactionSerializer '
+        'and CompactTransactionSerializer, including the query and JSON rendering'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per serializer; the best one is reported')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            user = self.seed(options['rows'])
+            queryset = Transaction.objects.filter(user=user)
+            full = self.measure(options['repeat'], lambda: TransactionSerializer(queryset, many=True).data)
+            compact = self.measure(
+                options['repeat'], lambda: CompactTransactionSerializer(CompactTransactionSerializer.values(queryset)).data
+            )
+            if full['output'] != compact['output']:
+                raise CommandError('CompactTransactionSerializer output differs from TransactionSerializer')
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        rows = options['rows']
+        report = {
+            'rows': rows,
+            'full_rows_per_second': round(rows / full['seconds']),
+            'compact_rows_per_second': round(rows / compact['seconds']),
+            'speedup': round(full['seconds'] / compact['seconds'], 2),
+        }
+        self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+
+    def seed(self, rows):
+        user = CustomUser.objects.create_user(
+            email='bench@example.com', username='bench', password='benchmark-password',
+        )
+        now = timezone.now()
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                amount=Decimal(random.randint(1, 50000)) / 100,
+                transaction_type=random.choice(('deposit', 'transfer', 'loan')),
+                status=random.choice(('pending', 'approved', 'rejected')),
+                processed_at=random.choice((None, now)),
+                description='benchmark',
+            )
+            for _ in range(rows)
+        ], batch_size=1000)
+        return user
+
+    def measure(self, repeat, serialize):
+        renderer = JSONRenderer()
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = renderer.render(serialize())
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return {'seconds': best, 'output': output}
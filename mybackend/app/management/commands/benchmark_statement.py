@@ -0,0 +1,161 @@
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from app import statements
+from app.models import CustomUser, Transaction
+from app.tokens import AccountRefreshToken
+
+SEED_BATCH = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway test database and streams growing statements through the export '
+        'endpoint over WSGI and ASGI, failing if peak Python memory grows with the statement size'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Rows in the largest statement')
+        parser.add_argument('--steps', type=int, default=3, help='Statement sizes measured, each 10x the previous')
+        parser.add_argument('--file-format', choices=sorted(statements.RENDERERS), default='csv')
+        parser.add_argument('--max-growth', type=float, default=1.5,
+                            help='Largest allowed ratio between the peaks of the largest and smallest statement')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        # Below a few fetch chunks memory is still ramping up, which would read as growth
+        floor = min(options['rows'], statements.CHUNK_SIZE * 5)
+        sizes = sorted({max(floor, options['rows'] // 10 ** step) for step in range(options['steps'])})
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            user = CustomUser.objects.create_user(email='bench@example.com', username='bench')
+            user.status = CustomUser.AccountStatus.APPROVED
+            user.save()
+            token = str(AccountRefreshToken.for_user(user).access_token)
+
+            results = []
+            seeded = 0
+            for size in sizes:
+                self.seed(user, size - seeded)
+                seeded = size
+                results.append({
+                    'rows': size,
+                    'wsgi': self.measure(self.fetch_wsgi, token, options['file_format']),
+                    'asgi': self.measure(self.fetch_asgi, token, options['file_format']),
+                })
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        smallest, largest = results[0], results[-1]
+        report = {
+            'file_format': options['file_format'],
+            'statements': results,
+            'row_growth': round(largest['rows'] / smallest['rows'], 2),
+            'peak_growth': {
+                interface: round(largest[interface]['peak_kib'] / max(smallest[interface]['peak_kib'], 1), 2)
+                for interface in ('wsgi', 'asgi')
+            },
+        }
+        self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+
+        grown = [
+            f'{interface} x{growth}' for interface, growth in report['peak_growth'].items()
+            if growth > options['max_growth']
+        ]
+        if grown:
+            raise CommandError(f'Peak memory grew with the statement size: {", ".join(grown)}')
+
+    def seed(self, user, rows):
+        now = timezone.now()
+        for start in range(0, rows, SEED_BATCH):
+            # Built per batch so seeding itself stays within a bounded amount of memory
+            Transaction.objects.bulk_create([
+                Transaction(
+                    user=user,
+                    amount=Decimal(random.randint(1, 50000)) / 100,
+                    transaction_type=random.choice(('deposit', 'transfer', 'loan')),
+                    status=random.choice(('pending', 'approved', 'rejected')),
+                    processed_at=random.choice((None, now)),
+                    description='benchmark',
+                )
+                for _ in range(min(SEED_BATCH, rows - start))
+            ], batch_size=1000)
+
+    def measure(self, fetch, token, file_format):
+        tracemalloc.start()
+        started = time.perf_counter()
+        size, lines = fetch(token, file_format)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'lines': lines,
+            'bytes': size,
+            'seconds': round(elapsed, 2),
+            'peak_kib': round(peak / 1024),
+        }
+
+    def fetch_wsgi(self, token, file_format):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = client.get(reverse('statement-export'), {'file_format': file_format})
+        if response.status_code != 200:
+            raise CommandError(f'Statement export failed with {response.status_code}')
+        size = 0
+        lines = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+        return size, lines
+
+    def fetch_asgi(self, token, file_format):
+        """The export as the uvicorn workers serve it, counting body messages as they are sent."""
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': reverse('statement-export'),
+            'query_string': f'file_format={file_format}'.encode(),
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 0),
+        }
+        received = {'size': 0, 'lines': 0, 'status': None}
+        request_sent = asyncio.Event()
+
+        async def receive():
+            if not request_sent.is_set():
+                request_sent.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client never disconnects mid-download
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                received['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                body = message.get('body', b'')
+                received['size'] += len(body)
+                received['lines'] += body.count(b'\n')
+
+        asyncio.run(ASGIHandler()(scope, receive, send))
+        if received['status'] != 200:
+            raise CommandError(f'Statement export failed with {received["status"]}')
+        return received['size'], received['lines']
@@ -0,0 +1,58 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from app.models import CustomUser, Transaction
+
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on app_transaction\b'),
+    'sqlite': re.compile(r'SCAN app_transaction\b(?! USING)'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN on the hot Transaction querysets and fails if any falls back to a sequential scan'
+
+    def hot_querysets(self):
+        user = CustomUser(pk=1)
+        since = timezone.now() - timedelta(days=7)
+        return [
+            # TransactionListView / TransactionDetailView
+            ('transaction list', Transaction.objects.filter(user=user)),
+            ('user pending', Transaction.objects.filter(user=user, status='pending')),
+            # TransactionListView.get_last_modified
+            ('transaction list validator', Transaction.objects.filter(user=user).values('user').annotate(
+                created=Max('created_at'), processed=Max('processed_at'),
+            )),
+            # TransactionAdmin list_filter combinations
+            ('admin type+status', Transaction.objects.filter(transaction_type='deposit', status='pending')),
+            ('admin created_at range', Transaction.objects.filter(created_at__gte=since)),
+            # approve_transactions / reject_transactions queue
+            ('approval queue', Transaction.objects.filter(status='pending')),
+        ]
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Query plan checks are not supported on {connection.vendor}')
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Small tables make the planner prefer seq scans; ask whether an index is usable at all
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset in self.hot_querysets():
+                plan = queryset.explain()
+                if pattern.search(plan):
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'{name}: sequential scan'))
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+
+        if failures:
+            raise CommandError(f'{len(failures)} queryset(s) fell back to a sequential scan: {", ".join(failures)}')
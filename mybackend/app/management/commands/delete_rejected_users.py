@@ -1,18 +1,52 @@
+import time
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
+from django.utils import timezone
+from app.cache import invalidate_user
 from app.models import CustomUser
 
 class Command(BaseCommand):
     help = 'Deletes users that were rejected more than 24 hours ago'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Users deleted per batch')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many users would be deleted')
+
     def handle(self, *args, **options):
-        users_to_delete = CustomUser.objects.filter(status=CustomUser.AccountStatus.REJECTED)
-        deleted_count = 0
+        cutoff = timezone.now() - timedelta(days=1)
+        users_to_delete = CustomUser.objects.filter(
+            status=CustomUser.AccountStatus.REJECTED,
+            status_changed_at__lt=cutoff,
+        )
 
-        for user in users_to_delete:
-            if user.should_be_deleted():
-                user.delete()
-                deleted_count += 1
+        if options['dry_run']:
+            self.stdout.write(f'{users_to_delete.count()} rejected users would be deleted')
+            return
+
+        started = time.monotonic()
+        deleted_count = 0
+        batches = 0
+        while True:
+            ids = list(users_to_delete.order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            batch_started = time.monotonic()
+            _, deleted = CustomUser.objects.filter(pk__in=ids).delete()
+            invalidate_user(*ids)
+            deleted_count += deleted.get(CustomUser._meta.label, 0)
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'Batch {batches}: deleted {len(ids)} users in {time.monotonic() - batch_started:.2f}s'
+                )
+            if options['sleep']:
+                time.sleep(options['sleep'])
 
         self.stdout.write(
-            self.style.SUCCESS(f'Successfully deleted {deleted_count} rejected users')
-        ) 
\ No newline at end of file
+            self.style.SUCCESS(
+                f'Successfully deleted {deleted_count} rejected users '
+                f'in {batches} batches ({time.monotonic() - started:.2f}s)'
+            )
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from app.models import CustomUser
+from app import statements
+
+
+class Command(BaseCommand):
+    help = "Streams a user's transaction statement as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('--start', help='First day to include (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day to include (YYYY-MM-DD)')
+        parser.add_argument('--file-format', choices=sorted(statements.RENDERERS), default='csv')
+        parser.add_argument('--output', help='File to write to (defaults to stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['email'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        dates = {}
+        for name in ('start', 'end'):
+            value = options[name]
+            try:
+                dates[name] = parse_date(value) if value else None
+            except ValueError:
+                dates[name] = None
+            if value and dates[name] is None:
+                raise CommandError(f'--{name} must be a date in YYYY-MM-DD format')
+
+        rows = statements.statement_rows(user, dates['start'], dates['end'])
+        chunks = statements.RENDERERS[options['file_format']](rows)
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,112 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+from django.utils.module_loading import import_string
+from app.events import LocalBackend
+from app.models import Transaction
+from app import services
+
+# Caches that live inside a single process, so the web workers would keep serving
+# the users and dashboards this worker invalidates
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+class Command(BaseCommand):
+    help = 'Approves transactions queued from the admin, claiming batches with SKIP LOCKED so several workers can run side by side'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Transactions claimed per batch')
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        self.check_shared_backends()
+        workers = max(1, options['workers'])
+        if workers == 1:
+            self.run_worker(0, options)
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=self.run_worker, args=(index, options))
+            for index in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+
+    def check_shared_backends(self):
+        """Refuse to start when approvals would not reach the web workers' caches and event streams."""
+        problems = []
+        if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+            problems.append('CACHE_BACKEND must be a cache shared with the web workers (e.g. redis or memcached)')
+        if issubclass(import_string(getattr(settings, 'EVENTS_BACKEND', 'app.events.LocalBackend')), LocalBackend):
+            problems.append('EVENTS_BACKEND must publish across processes (app.events.RedisBackend)')
+        if problems:
+            raise CommandError('; '.join(problems))
+
+    def run_worker(self, index, options):
+        approved_total = 0
+        failed_total = 0
+        try:
+            while True:
+                try:
+                    approved, failed = self.process_batch(options['batch_size'])
+                except DatabaseError as exc:
+                    # Deadlocks, serialization failures and dropped connections: the
+                    # batch was rolled back and stays queued, so back off and retry
+                    self.stderr.write(f'worker {index}: batch failed, retrying: {exc}')
+                    connections.close_all()
+                    time.sleep(options['sleep'])
+                    continue
+                if approved or failed:
+                    approved_total += approved
+                    failed_total += failed
+                    self.stdout.write(
+                        f'worker {index}: approved {approved}, failed {failed} '
+                        f'(total approved {approved_total}, failed {failed_total}, '
+                        f'{self.queue_depth()} still queued)'
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f'worker {index}: done, approved {approved_total}, failed {failed_total}'
+        ))
+
+    def queue_depth(self):
+        return Transaction.objects.filter(status='pending', queued_at__isnull=False).count()
+
+    def process_batch(self, batch_size):
+        with transaction.atomic():
+            batch = list(
+                Transaction.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', queued_at__isnull=False)
+                .order_by('queued_at', 'id')[:batch_size]
+            )
+            if not batch:
+                return 0, 0
+
+            # One call locks every account in the batch once, in id order; each row
+            # is credited to the admin who queued it
+            approved, errors = services.approve_transactions(batch)
+            for txn, message in errors:
+                self.stderr.write(f'Error approving transaction {txn.pk}: {message}')
+
+            # Hand failed rows back to the admin instead of retrying them forever
+            Transaction.objects.filter(pk__in=[txn.pk for txn, _ in errors]).update(queued_at=None, queued_by=None)
+        return len(approved), len(errors)
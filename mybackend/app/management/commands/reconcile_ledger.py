@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from app.models import CustomUser, LedgerEntry
+
+
+class Command(BaseCommand):
+    help = 'Verifies CustomUser balances against the ledger, one chunk of accounts at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        accounts = CustomUser.objects.order_by('pk').values_list('pk', 'email', 'balance', 'loan_balance')
+        checked = 0
+        mismatches = 0
+        chunk = []
+        for account in accounts.iterator(chunk_size=chunk_size):
+            chunk.append(account)
+            if len(chunk) == chunk_size:
+                mismatches += self.reconcile(chunk)
+                checked += len(chunk)
+                chunk = []
+        if chunk:
+            mismatches += self.reconcile(chunk)
+            checked += len(chunk)
+
+        if mismatches:
+            raise CommandError(f'{mismatches} of {checked} accounts do not match the ledger')
+        self.stdout.write(self.style.SUCCESS(f'All {checked} accounts match the ledger'))
+
+    def reconcile(self, chunk):
+        totals = {}
+        rows = (
+            LedgerEntry.objects.filter(user_id__in=[pk for pk, *_ in chunk], account__in=['balance', 'loan'])
+            .values('user_id', 'account').annotate(total=Sum('amount')).order_by()
+        )
+        for row in rows:
+            totals[(row['user_id'], row['account'])] = row['total']
+
+        mismatches = 0
+        for pk, email, balance, loan_balance in chunk:
+            ledger_balance = totals.get((pk, 'balance'), 0)
+            ledger_loan_balance = -totals.get((pk, 'loan'), 0)
+            if balance != ledger_balance or loan_balance != ledger_loan_balance:
+                mismatches += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{email}: balance {balance} (ledger {ledger_balance}), '
+                    f'loan balance {loan_balance} (ledger {ledger_loan_balance})'
+                ))
+        return mismatches
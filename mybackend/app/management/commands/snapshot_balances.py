@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from app.ledger import take_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Records balance snapshots for every account with ledger activity since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=int, default=60,
+                            help='Seconds to stay behind now so in-flight approvals are not cut in half')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        taken_at = timezone.now() - timedelta(seconds=options['lag'])
+        created = take_snapshots(taken_at, chunk_size=options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Recorded {created} balance snapshots as of {taken_at.isoformat()}')
+        )
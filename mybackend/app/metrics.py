@@ -0,0 +1,332 @@
+"""
+Minimal Prometheus-style metrics registry.
+
+Writes go to a per-thread shard, so the hot path never takes a lock; the
+shards are summed when /metrics is scraped. With ``METRICS_MULTIPROC_DIR``
+set, every worker process also dumps its totals to a JSON file in that
+directory (at most once per ``METRICS_FLUSH_INTERVAL`` seconds and at exit)
+and the scraping worker merges all of them, so the numbers cover every
+gunicorn worker rather than whichever one served the scrape. Files left
+behind by workers that have since exited are removed on a process's first
+flush.
+"""
+import atexit
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count
+
+logger = logging.getLogger('app.metrics')
+
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+APPROVAL_LATENCY_BUCKETS = (60, 300, 900, 3600, 6 * 3600, 24 * 3600, 3 * 24 * 3600, 7 * 24 * 3600)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._shards = []
+        self._local = threading.local()
+
+    def samples(self):
+        """Return ``{label values: value}`` summed over every thread's shard."""
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for key, value in list(shard.items()):
+                merged[key] = self._merge(merged.get(key), value)
+        return merged
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+        registry.maybe_flush()
+
+    def _merge(self, current, value):
+        return (current or 0) + value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=REQUEST_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        # Per-bucket counts followed by the +Inf bucket, the sum and the count
+        state = shard.get(key)
+        if state is None:
+            state = shard[key] = [0] * (len(self.buckets) + 3)
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+        registry.maybe_flush()
+
+    def _merge(self, current, value):
+        if current is None:
+            return list(value)
+        return [a + b for a, b in zip(current, value)]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._stale_removed = False
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def register_collector(self, collector):
+        """Add a callable returning ``[(name, type, help, [(labels, value), ...])]`` computed at scrape time."""
+        self.collectors.append(collector)
+        return collector
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+
+    def after_fork(self):
+        # A forked worker starts from zero instead of re-reporting the parent's
+        # totals, and must not inherit a flush lock held by another thread
+        self.reset()
+        self._flush_lock = threading.Lock()
+        self._stale_removed = False
+
+    # Multiprocess support
+
+    @property
+    def multiproc_dir(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+    def snapshot(self):
+        return {
+            name: [[list(key), value] for key, value in metric.samples().items()]
+            for name, metric in self.metrics.items()
+        }
+
+    def maybe_flush(self):
+        directory = self.multiproc_dir
+        if not directory:
+            return
+        if time.monotonic() - self._last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0):
+            return
+        # Another thread is already writing this process's file
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            self._write(directory)
+        finally:
+            self._flush_lock.release()
+
+    def flush(self):
+        directory = self.multiproc_dir
+        if not directory:
+            return
+        with self._flush_lock:
+            self._write(directory)
+
+    def _write(self, directory):
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            if not self._stale_removed:
+                self._remove_stale_files(directory)
+                self._stale_removed = True
+            with open(temporary, 'w') as handle:
+                json.dump(self.snapshot(), handle)
+            os.replace(temporary, path)
+        except OSError:
+            # Metrics must never fail the request that happened to trigger the flush
+            logger.warning('Could not write metrics to %s', path, exc_info=True)
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+
+    def _remove_stale_files(self, directory):
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json*')):
+            pid = os.path.basename(path).split('.')[0].removeprefix('metrics-')
+            if not pid.isdigit() or _process_alive(int(pid)):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def merged_samples(self):
+        if not self.multiproc_dir:
+            return {name: metric.samples() for name, metric in self.metrics.items()}
+
+        self.flush()
+        merged = {name: {} for name in self.metrics}
+        for path in glob.glob(os.path.join(self.multiproc_dir, 'metrics-*.json')):
+            try:
+                with open(path) as handle:
+                    snapshot = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in samples:
+                    key = tuple(key)
+                    merged[name][key] = metric._merge(merged[name].get(key), value)
+        return merged
+
+    # Exposition
+
+    def render(self):
+        lines = []
+        for name, samples in self.merged_samples().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            for key, value in sorted(samples.items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.type == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (math.inf,), value):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(labels)} {_number(value[-2])}')
+                    lines.append(f'{name}_count{_labels(labels)} {value[-1]}')
+                else:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+
+        for collector in self.collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+registry = Registry()
+atexit.register(registry.flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry.after_fork)
+
+
+http_requests = Counter(
+    'bank_http_requests_total', 'API requests by view, method and status code.', ('view', 'method', 'status'),
+)
+http_request_latency = Histogram(
+    'bank_http_request_duration_seconds', 'API request latency by view.', ('view',),
+)
+logins = Counter(
+    'bank_logins_total', 'Login attempts by outcome.', ('outcome',),
+)
+registrations = Counter(
+    'bank_registrations_total', 'Registration attempts by outcome.', ('outcome',),
+)
+transactions_created = Counter(
+    'bank_transactions_created_total', 'Transactions submitted by clients, by type.', ('type',),
+)
+transactions_processed = Counter(
+    'bank_transactions_processed_total', 'Transactions processed by admins, by type and outcome.', ('type', 'outcome'),
+)
+approval_latency = Histogram(
+    'bank_transaction_approval_latency_seconds', 'Time from submission (created_at) to processing (processed_at).',
+    ('type',), buckets=APPROVAL_LATENCY_BUCKETS,
+)
+
+
+@registry.register_collector
+def pending_transactions():
+    from .models import Transaction
+    rows = (
+        Transaction.objects.filter(status='pending').order_by()
+        .values('transaction_type').annotate(count=Count('id'))
+    )
+    return [(
+        'bank_pending_transactions', 'gauge', 'Transactions waiting for admin approval, by type.',
+        [({'type': row['transaction_type']}, row['count']) for row in rows],
+    )]
+
+
+def observe_processed(transaction, outcome):
+    transactions_processed.inc(type=transaction.transaction_type, outcome=outcome)
+    if outcome != 'failed' and transaction.processed_at and transaction.created_at:
+        approval_latency.observe(
+            (transaction.processed_at - transaction.created_at).total_seconds(),
+            type=transaction.transaction_type,
+        )
@@ -0,0 +1,205 @@
+import gzip
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from . import metrics
+
+logger = logging.getLogger('app.queries')
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryMetricsMiddleware:
+    """
+    Opt-in per-request SQL accounting (``QUERY_METRICS_ENABLED``).
+
+    Records the query count, total database time and slowest statements of
+    each request, reports them in a ``Server-Timing`` header and a structured
+    log line, and checks them against the view's ``query_budget`` attribute.
+    With ``QUERY_BUDGET_STRICT`` an overrun raises, which fails the test that
+    made the request. It is sync-only, so under ASGI it also moves every
+    request onto a thread; leave it off there outside of profiling.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slowest_count = getattr(settings, 'QUERY_METRICS_SLOWEST', 3)
+        self.strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+
+    def __call__(self, request):
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append(((time.perf_counter() - started) * 1000, sql))
+
+        request._query_budget = None
+        with connection.execute_wrapper(record):
+            response = self.get_response(request)
+
+        db_ms = sum(duration for duration, _ in queries)
+        slowest = sorted(queries, key=lambda query: query[0], reverse=True)[:self.slowest_count]
+        response['Server-Timing'] = f'db;dur={db_ms:.2f};desc="{len(queries)} queries"'
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': len(queries),
+            'db_ms': round(db_ms, 2),
+            'slowest': [{'ms': round(duration, 2), 'sql': sql[:300]} for duration, sql in slowest],
+        }))
+
+        budget = request._query_budget
+        if budget is not None and len(queries) > budget:
+            message = f'{request.method} {request.path} ran {len(queries)} queries, budget is {budget}'
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        request._query_budget = getattr(view_class, 'query_budget', None)
+
+
+class RequestMetricsMiddleware:
+    """Counts requests and records latency per URL name for the /metrics endpoint."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, started)
+        return response
+
+    def record(self, request, response, started):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        metrics.http_requests.inc(view=view, method=request.method, status=response.status_code)
+        metrics.http_request_latency.observe(time.perf_counter() - started, view=view)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can sit in an async middleware chain.
+
+    The stock middleware is sync-only, which makes Django run every request
+    under ASGI through a thread. Only static file hits need that here.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+def accepted_encodings(header):
+    """``{'gzip': 1.0, 'br': 0.5}`` from an Accept-Encoding header, leaving out q=0 entries."""
+    encodings = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if name and quality > 0:
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses API responses with brotli (when the ``brotli`` package is
+    installed) or gzip, whichever the client prefers.
+
+    Bodies under ``COMPRESSION_MIN_SIZE`` bytes go out as they are, since the
+    saving would not pay for the CPU. Streaming responses (statement exports,
+    the event stream, static files) are left alone.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        available = ('br', 'gzip') if brotli is not None else ('gzip',)
+        candidates = [name for name in available if name in accepted]
+        if not candidates:
+            return response
+        # max() keeps the first of equal weights, so brotli wins ties
+        encoding = max(candidates, key=accepted.get)
+        if encoding == 'br':
+            content = brotli.compress(response.content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5))
+        else:
+            content = gzip.compress(response.content, compresslevel=getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6), mtime=0)
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # The encoded body is no longer byte-identical (same reasoning as GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
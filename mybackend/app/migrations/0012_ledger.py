@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # Seed the ledger with each account's current balances so it reconciles from day one
+    CustomUser = apps.get_model('app', 'CustomUser')
+    LedgerEntry = apps.get_model('app', 'LedgerEntry')
+    entries = []
+    accounts = CustomUser.objects.exclude(balance=0, loan_balance=0).values_list('id', 'balance', 'loan_balance')
+    for user_id, balance, loan_balance in accounts.iterator(chunk_size=1000):
+        if balance:
+            entries.append(LedgerEntry(user_id=user_id, account='balance', amount=balance))
+            entries.append(LedgerEntry(user_id=user_id, account='external', amount=-balance))
+        if loan_balance:
+            entries.append(LedgerEntry(user_id=user_id, account='loan', amount=-loan_balance))
+            entries.append(LedgerEntry(user_id=user_id, account='external', amount=loan_balance))
+    LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_transaction_approval_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('loan_balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'taken_at'), name='unique_user_snapshot')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(choices=[('balance', 'Balance'), ('loan', 'Loan'), ('external', 'External')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='app.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='ledger_user_created_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+# Keep in sync with app.account_numbers
+SEQUENCE_NAME = 'app_account_number_seq'
+FIRST_SERIAL = 100000000
+BLOCK_SIZE = 100
+
+
+def create_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE_NAME} START {FIRST_SERIAL} INCREMENT {BLOCK_SIZE}'
+        )
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP SEQUENCE IF EXISTS {SEQUENCE_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_serial', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
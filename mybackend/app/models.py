@@ -3,9 +3,10 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from datetime import timedelta
-import random
-import string
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
+from .cache import invalidate_dashboard, invalidate_user
+from . import events, metrics
 
 class CustomUser(AbstractUser):
     class AccountStatus(models.TextChoices):
@@ -27,6 +28,7 @@ class CustomUser(AbstractUser):
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     loan_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     account_number = models.CharField(max_length=10, unique=True, blank=True)
+    token_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -35,22 +37,21 @@ class CustomUser(AbstractUser):
         return self.email
 
     def generate_account_number(self):
-        """Generate a unique 10-digit account number"""
-        while True:
-            # Generate a 10-digit number
-            account_number = ''.join(random.choices(string.digits, k=10))
-            # Check if it already exists
-            if not CustomUser.objects.filter(account_number=account_number).exists():
-                return account_number
+        """Allocate a unique 10-digit account number (9-digit serial + Luhn check digit)"""
+        from .account_numbers import allocator
+        return allocator.allocate()
 
     def save(self, *args, **kwargs):
         if not self.account_number:
             self.account_number = self.generate_account_number()
         super().save(*args, **kwargs)
+        invalidate_user(self.pk)
 
     def mark_as_rejected(self):
         self.status = self.AccountStatus.REJECTED
         self.status_changed_at = timezone.now()
+        # Invalidates every token minted so far (checked by IsApprovedAccount)
+        self.token_version += 1
         self.save()
 
     def mark_as_approved(self):
@@ -67,6 +68,14 @@ class CustomUser(AbstractUser):
         verbose_name = _('user')
         verbose_name_plural = _('users')
 
+class AccountNumberSequence(models.Model):
+    """Counter used to reserve account number blocks on databases without native sequences."""
+    next_serial = models.BigIntegerField()
+
+    def __str__(self):
+        return str(self.next_serial)
+
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = (
         ('deposit', 'Deposit'),
@@ -89,55 +98,97 @@ class Transaction(models.Model):
     description = models.CharField(max_length=255, blank=True)
     processed_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='processed_transactions')
     recipient_email = models.EmailField(blank=True, null=True)
+    queued_at = models.DateTimeField(null=True, blank=True)
+    queued_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='queued_transactions')
 
     def __str__(self):
         return f"{self.user.email} - {self.transaction_type_display()} - {self.amount}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_dashboard(self.user_id)
+
     def transaction_type_display(self):
+        return dict(self.TRANSACTION_TYPES).get(self.transaction_type, self.transaction_type)
+
+    def build_ledger_entries(self, recipient=None):
+        """Build the (unsaved) double-entry legs for approving this transaction."""
         if self.transaction_type == 'deposit':
-            return 'Deposit'
+            legs = [(self.user_id, 'balance', self.amount), (self.user_id, 'external', -self.amount)]
         elif self.transaction_type == 'transfer':
-            return 'Transfer'
+            legs = [(self.user_id, 'balance', -self.amount), (recipient.pk, 'balance', self.amount)]
         elif self.transaction_type == 'loan':
-            return 'Loan'
+            legs = [(self.user_id, 'balance', self.amount), (self.user_id, 'loan', -self.amount)]
         else:
-            return self.transaction_type
+            raise ValueError(f"Invalid transaction type: {self.transaction_type}")
+        return [
+            LedgerEntry(user_id=user_id, transaction=self, account=account, amount=amount)
+            for user_id, account, amount in legs
+        ]
+
+    @staticmethod
+    def _lock_accounts(*user_ids):
+        # Always lock in id order so concurrent approvals can't deadlock
+        accounts = CustomUser.objects.select_for_update().filter(pk__in=user_ids).order_by('pk')
+        return {account.pk: account for account in accounts}
+
+    def _lock_pending(self, action):
+        current = Transaction.objects.select_for_update().only('status').get(pk=self.pk)
+        if current.status != 'pending':
+            raise ValueError(f"Only pending transactions can be {action}")
 
     def approve(self, admin_user):
         if self.status != 'pending':
             raise ValueError("Only pending transactions can be approved")
-        
+
+        try:
+            self._apply_approval(admin_user)
+        except ValueError:
+            metrics.observe_processed(self, 'failed')
+            raise
+        metrics.observe_processed(self, 'approved')
+
+    def _apply_approval(self, admin_user):
         with transaction.atomic():
+            # Re-check under lock: another admin may have processed it meanwhile
+            self._lock_pending('approved')
+            recipient = None
+
             if self.transaction_type == 'deposit':
-                self.user.balance += self.amount
-                self.user.save()
+                user = self._lock_accounts(self.user_id)[self.user_id]
+                user.balance += self.amount
+                user.save(update_fields=['balance', 'updated_at'])
             elif self.transaction_type == 'transfer':
                 # Check if recipient exists
                 try:
-                    recipient = CustomUser.objects.get(email=self.recipient_email)
+                    recipient_id = CustomUser.objects.values_list('pk', flat=True).get(email=self.recipient_email)
                 except CustomUser.DoesNotExist:
                     raise ValueError("Recipient does not exist")
+
+                accounts = self._lock_accounts(self.user_id, recipient_id)
+                user = accounts[self.user_id]
+                recipient = accounts[recipient_id]
                 
                 # Check if sender has sufficient balance
-                if self.user.balance < self.amount:
+                if user.balance < self.amount:
                     raise ValueError("Insufficient balance")
                 
                 # Deduct from sender
-                self.user.balance -= self.amount
-                self.user.save()
+                user.balance -= self.amount
+                user.save(update_fields=['balance', 'updated_at'])
                 
                 # Add to recipient
                 recipient.balance += self.amount
-                recipient.save()
+                recipient.save(update_fields=['balance', 'updated_at'])
                 
                 # Create a separate transaction record for the recipient
-                Transaction.objects.create(
+                incoming = Transaction.objects.create(
                     user=recipient,
                     transaction_type='transfer',
                     amount=self.amount,
                     status='approved',
-                    description=f"Received transfer from {self.user.email}",
-                    recipient_email=self.user.email,  # Store sender's email as recipient for the incoming transfer
+                    description=f"Received transfer from {user.email}",
+                    recipient_email=user.email,  # Store sender's email as recipient for the incoming transfer
                     processed_by=admin_user
                 )
             elif self.transaction_type == 'loan':
@@ -146,28 +197,131 @@ class Transaction(models.Model):
                     raise ValueError("Loan amount must be greater than zero")
                 
                 # Update user's loan balance and regular balance
-                self.user.loan_balance += self.amount
-                self.user.balance += self.amount
-                self.user.save()
+                user = self._lock_accounts(self.user_id)[self.user_id]
+                user.loan_balance += self.amount
+                user.balance += self.amount
+                user.save(update_fields=['balance', 'loan_balance', 'updated_at'])
                 
                 # Update the transaction's loan balance field
-                self.loan_balance = self.user.loan_balance
+                self.loan_balance = user.loan_balance
             else:
                 raise ValueError(f"Invalid transaction type: {self.transaction_type}")
+
+            LedgerEntry.objects.bulk_create(self.build_ledger_entries(recipient))
+
+            # Keep the cached user in step with what was just written
+            self.user.balance = user.balance
+            self.user.loan_balance = user.loan_balance
             
             self.status = 'approved'
             self.processed_at = timezone.now()
             self.processed_by = admin_user
-            self.save()
+            self.save(update_fields=['status', 'processed_at', 'processed_by', 'loan_balance'])
+            events.publish_transactions([self, incoming] if recipient else [self])
 
     def reject(self, admin_user):
         if self.status != 'pending':
             raise ValueError("Only pending transactions can be rejected")
         
-        self.status = 'rejected'
-        self.processed_at = timezone.now()
-        self.processed_by = admin_user
-        self.save()
+        with transaction.atomic():
+            self._lock_pending('rejected')
+            self.status = 'rejected'
+            self.processed_at = timezone.now()
+            self.processed_by = admin_user
+            self.save(update_fields=['status', 'processed_at', 'processed_by'])
+            events.publish_transactions([self])
+        metrics.observe_processed(self, 'rejected')
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='txn_user_created_id_idx'),
+            models.Index(fields=['user', 'status'], name='txn_user_status_idx'),
+            models.Index(fields=['transaction_type', 'status'], name='txn_type_status_idx'),
+            models.Index(fields=['created_at'], name='txn_created_idx'),
+            # Conditional GET validator for the transaction list
+            models.Index(fields=['user', 'processed_at'], name='txn_user_processed_idx'),
+            # Admin approval queue only ever looks at pending rows
+            models.Index(
+                fields=['created_at'],
+                name='txn_pending_created_idx',
+                condition=models.Q(status='pending'),
+            ),
+            # Rows waiting for the process_transactions worker
+            models.Index(
+                fields=['queued_at', 'id'],
+                name='txn_approval_queue_idx',
+                condition=models.Q(status='pending', queued_at__isnull=False),
+            ),
+        ]
+
+
+class LedgerEntry(models.Model):
+    """
+    One leg of a double-entry posting. The legs written for a transaction
+    always sum to zero; ``balance`` legs add up to ``CustomUser.balance`` and
+    ``loan`` legs to minus ``CustomUser.loan_balance``.
+    """
+    ACCOUNTS = (
+        ('balance', 'Balance'),
+        ('loan', 'Loan'),
+        ('external', 'External'),
+    )
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='ledger_entries')
+    transaction = models.ForeignKey(Transaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    account = models.CharField(max_length=10, choices=ACCOUNTS)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.account} - {self.amount}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Ledger entries are append-only")
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='ledger_user_created_idx'),
+        ]
+
+
+class BalanceSnapshot(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='balance_snapshots')
+    taken_at = models.DateTimeField()
+    balance = models.DecimalField(max_digits=10, decimal_places=2)
+    loan_balance = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.user_id} @ {self.taken_at}"
+
+    class Meta:
+        ordering = ['-taken_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'taken_at'], name='unique_user_snapshot'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """Stored response for a money-movement POST, replayed when the client retries with the same key."""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_user_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
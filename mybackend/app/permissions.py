@@ -0,0 +1,31 @@
+from rest_framework.permissions import BasePermission
+from .models import CustomUser
+
+
+class IsApprovedAccount(BasePermission):
+    """
+    Allows access only to approved accounts whose token has not been revoked.
+
+    Compares the token's ``status`` and ``token_version`` claims with the
+    authenticated user, which CachedJWTAuthentication has already resolved,
+    so no extra query is needed. ``mark_as_rejected`` bumps the user's
+    ``token_version``, which revokes every token minted before. Tokens
+    minted before those claims existed only get the status check.
+    """
+    message = 'Your account is not approved.'
+
+    def has_permission(self, request, view):
+        user = request.user
+        if getattr(user, 'status', None) != CustomUser.AccountStatus.APPROVED:
+            return False
+        token = request.auth
+        if token is None or 'status' not in token:
+            return True
+        return (
+            token['status'] == CustomUser.AccountStatus.APPROVED
+            and token.get('token_version', 0) == user.token_version
+        )
+
+    async def ahas_permission(self, request, view):
+        """``has_permission`` for async views; it makes no I/O calls, so it delegates."""
+        return self.has_permission(request, view)
@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.utils import timezone
 from .models import Transaction, CustomUser
+from .cache import invalidate_dashboard
 
 User = get_user_model()
 
@@ -47,20 +50,64 @@ class TransactionSerializer(serializers.ModelSerializer):
     processed_by = serializers.PrimaryKeyRelatedField(read_only=True)
     status = serializers.CharField(read_only=True)
     processed_at = serializers.DateTimeField(read_only=True)
-    transaction_type_display = serializers.SerializerMethodField()
+    transaction_type_display = serializers.CharField(read_only=True)
 
     class Meta:
         model = Transaction
         fields = ('id', 'user', 'amount', 'transaction_type', 'transaction_type_display', 'status', 'created_at', 'processed_at', 'processed_by', 'description')
         read_only_fields = ('id', 'user', 'status', 'created_at', 'processed_at', 'processed_by')
 
-    def get_transaction_type_display(self, obj):
-        if obj.transaction_type == 'deposit':
-            return 'Deposit'
-        elif obj.transaction_type == 'transfer':
-            return 'Transfer'
-        else:
-            return obj.transaction_type
+class CompactTransactionSerializer:
+    """
+    Read-only fast path producing the same items as TransactionSerializer.
+
+    Works on ``.values()`` rows instead of model instances and formats each
+    column directly, skipping DRF's per-field machinery. Clients opt in with
+    ``?compact=1`` on the transaction list.
+    """
+    query_param = 'compact'
+    columns = ('id', 'user_id', 'amount', 'transaction_type', 'status', 'created_at', 'processed_at', 'processed_by_id', 'description')
+    type_labels = dict(Transaction.TRANSACTION_TYPES)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def requested(cls, request):
+        return request.query_params.get(cls.query_param) in ('1', 'true')
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.columns)
+
+    @property
+    def data(self):
+        labels = self.type_labels
+        tz = timezone.get_current_timezone()
+        return [
+            {
+                'id': row['id'],
+                'user': row['user_id'],
+                'amount': str(row['amount']),
+                'transaction_type': row['transaction_type'],
+                'transaction_type_display': labels.get(row['transaction_type'], row['transaction_type']),
+                'status': row['status'],
+                'created_at': _isoformat(row['created_at'], tz),
+                'processed_at': _isoformat(row['processed_at'], tz),
+                'processed_by': row['processed_by_id'],
+                'description': row['description'],
+            }
+            for row in self.rows
+        ]
+
+def _isoformat(value, tz):
+    # Same output as serializers.DateTimeField with the default format
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
 
 class TransactionCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -146,4 +193,58 @@ class TransferSerializer(serializers.Serializer):
             description=description,
             recipient_email=recipient.email
         )
-        return transaction 
\ No newline at end of file
+        return transaction
+
+class TransferItemSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    recipient_account_number = serializers.CharField()
+    description = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Amount must be greater than zero.')
+        return value
+
+class BulkTransferSerializer(serializers.Serializer):
+    transfers = TransferItemSerializer(many=True, allow_empty=False, max_length=settings.BULK_TRANSFER_MAX_ITEMS)
+
+    def validate(self, data):
+        user = self.context['request'].user
+        transfers = data['transfers']
+        account_numbers = {item['recipient_account_number'] for item in transfers}
+        recipients = CustomUser.objects.in_bulk(account_numbers, field_name='account_number')
+
+        # Keyed by item index, like DRF's own per-item list errors
+        errors = {}
+        for index, item in enumerate(transfers):
+            recipient = recipients.get(item['recipient_account_number'])
+            if recipient is None:
+                errors[index] = {'recipient_account_number': ['Recipient account number does not exist.']}
+            elif recipient == user:
+                errors[index] = {'recipient_account_number': ['Cannot transfer to your own account.']}
+            else:
+                item['recipient'] = recipient
+        if errors:
+            raise serializers.ValidationError({'transfers': errors})
+
+        if user.balance < sum(item['amount'] for item in transfers):
+            raise serializers.ValidationError('Insufficient balance.')
+        return data
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        transactions = Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                recipient=item['recipient'],
+                amount=item['amount'],
+                transaction_type='transfer',
+                status='pending',
+                description=item.get('description', ''),
+                recipient_email=item['recipient'].email
+            )
+            for item in validated_data['transfers']
+        ])
+        # bulk_create skips Transaction.save()
+        invalidate_dashboard(user.pk)
+        return transactions
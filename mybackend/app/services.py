@@ -0,0 +1,128 @@
+from django.db import transaction as db_transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from .cache import invalidate_user
+from . import events, metrics
+from .models import CustomUser, LedgerEntry, Transaction
+
+BULK_BATCH_SIZE = 500
+
+
+def approve_transactions(transactions, admin_user=None):
+    """
+    Approve a batch of pending transactions in a single database transaction.
+
+    Every affected account is locked once, in id order, and balances are
+    written back with one bulk update instead of a save per row. Rows that
+    fail validation are left pending and reported back. Without an
+    ``admin_user`` each row is recorded as processed by the admin who queued
+    it (``queued_by``).
+
+    Returns a tuple ``(approved, errors)`` where ``errors`` is a list of
+    ``(transaction, message)`` pairs.
+    """
+    if isinstance(transactions, QuerySet):
+        ids = list(transactions.values_list('pk', flat=True))
+    else:
+        ids = [t.pk for t in transactions]
+    approved = []
+    errors = []
+
+    with db_transaction.atomic():
+        pending = list(
+            Transaction.objects.select_for_update()
+            .filter(pk__in=ids, status='pending')
+            .order_by('created_at', 'id')
+        )
+        if not pending:
+            return approved, errors
+
+        recipient_emails = {t.recipient_email for t in pending if t.transaction_type == 'transfer' and t.recipient_email}
+        recipient_ids = dict(
+            CustomUser.objects.filter(email__in=recipient_emails).values_list('email', 'id')
+        )
+        user_ids = {t.user_id for t in pending} | set(recipient_ids.values())
+        users = {
+            user.pk: user
+            for user in CustomUser.objects.select_for_update().filter(pk__in=user_ids).order_by('pk')
+        }
+
+        now = timezone.now()
+        changed_users = {}
+        counterparts = []
+        ledger_entries = []
+
+        for txn in pending:
+            user = users[txn.user_id]
+            processed_by_id = admin_user.pk if admin_user is not None else txn.queued_by_id
+            if txn.transaction_type == 'deposit':
+                user.balance += txn.amount
+                ledger_entries.extend(txn.build_ledger_entries())
+            elif txn.transaction_type == 'transfer':
+                recipient = users.get(recipient_ids.get(txn.recipient_email))
+                if recipient is None:
+                    errors.append((txn, "Recipient does not exist"))
+                    continue
+                if user.balance < txn.amount:
+                    errors.append((txn, "Insufficient balance"))
+                    continue
+                user.balance -= txn.amount
+                recipient.balance += txn.amount
+                changed_users[recipient.pk] = recipient
+                ledger_entries.extend(txn.build_ledger_entries(recipient))
+                counterparts.append(Transaction(
+                    user=recipient,
+                    transaction_type='transfer',
+                    amount=txn.amount,
+                    status='approved',
+                    description=f"Received transfer from {user.email}",
+                    recipient_email=user.email,
+                    processed_by_id=processed_by_id
+                ))
+            elif txn.transaction_type == 'loan':
+                if txn.amount <= 0:
+                    errors.append((txn, "Loan amount must be greater than zero"))
+                    continue
+                user.loan_balance += txn.amount
+                user.balance += txn.amount
+                txn.loan_balance = user.loan_balance
+                ledger_entries.extend(txn.build_ledger_entries())
+            else:
+                errors.append((txn, f"Invalid transaction type: {txn.transaction_type}"))
+                continue
+
+            changed_users[user.pk] = user
+            txn.status = 'approved'
+            txn.processed_at = now
+            txn.processed_by_id = processed_by_id
+            approved.append(txn)
+
+        for user in changed_users.values():
+            user.updated_at = now
+        CustomUser.objects.bulk_update(
+            changed_users.values(), ['balance', 'loan_balance', 'updated_at'], batch_size=BULK_BATCH_SIZE
+        )
+        # Every approved row gets the same status and timestamp: one UPDATE per
+        # processing admin instead of a CASE per row. Only loans carry a balance.
+        approved_by = {}
+        for txn in approved:
+            approved_by.setdefault(txn.processed_by_id, []).append(txn.pk)
+        for processed_by_id, pks in approved_by.items():
+            for start in range(0, len(pks), BULK_BATCH_SIZE):
+                Transaction.objects.filter(pk__in=pks[start:start + BULK_BATCH_SIZE]).update(
+                    status='approved', processed_at=now, processed_by_id=processed_by_id
+                )
+        Transaction.objects.bulk_update(
+            [txn for txn in approved if txn.transaction_type == 'loan'], ['loan_balance'], batch_size=BULK_BATCH_SIZE
+        )
+        Transaction.objects.bulk_create(counterparts, batch_size=BULK_BATCH_SIZE)
+        LedgerEntry.objects.bulk_create(ledger_entries, batch_size=BULK_BATCH_SIZE)
+        # bulk_update/bulk_create skip save(), so invalidate explicitly
+        invalidate_user(*changed_users)
+        events.publish_transactions(approved + counterparts)
+
+    for txn in approved:
+        metrics.observe_processed(txn, 'approved')
+    for txn, _ in errors:
+        metrics.observe_processed(txn, 'failed')
+    return approved, errors
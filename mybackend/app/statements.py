@@ -0,0 +1,99 @@
+import csv
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .models import Transaction
+
+STATEMENT_FIELDS = (
+    'id', 'created_at', 'transaction_type', 'status', 'amount',
+    'description', 'recipient_email', 'processed_at',
+)
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object that hands csv.writer output straight back."""
+    def write(self, value):
+        return value
+
+
+def statement_queryset(user, start=None, end=None):
+    """The user's transactions oldest first, ``start``/``end`` being inclusive dates."""
+    queryset = Transaction.objects.filter(user=user).order_by('created_at', 'id')
+    if start:
+        queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end:
+        queryset = queryset.filter(created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
+    return queryset.values_list(*STATEMENT_FIELDS)
+
+
+def statement_rows(user, start=None, end=None):
+    return statement_queryset(user, start, end).iterator(chunk_size=CHUNK_SIZE)
+
+
+async def astatement_rows(user, start=None, end=None):
+    """``statement_rows`` for ASGI, fetched chunk by chunk without blocking the event loop."""
+    # QuerySet.aiterator() runs values_list() queries on the event loop, so drive
+    # the sync iterator from Django's database thread instead
+    rows = statement_rows(user, start, end)
+    next_chunk = sync_to_async(lambda: list(islice(rows, CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
+
+
+def plain_values(row):
+    # Full isoformat() in both formats; DjangoJSONEncoder alone would cut datetimes to milliseconds
+    return [value.isoformat() if isinstance(value, datetime) else value for value in row]
+
+
+def csv_row(writer, row):
+    return writer.writerow(plain_values(row))
+
+
+def ndjson_row(encoder, row):
+    return encoder.encode(dict(zip(STATEMENT_FIELDS, plain_values(row)))) + '\n'
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(STATEMENT_FIELDS)
+    for row in rows:
+        yield csv_row(writer, row)
+
+
+def render_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield ndjson_row(encoder, row)
+
+
+async def arender_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(STATEMENT_FIELDS)
+    async for row in rows:
+        yield csv_row(writer, row)
+
+
+async def arender_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    async for row in rows:
+        yield ndjson_row(encoder, row)
+
+
+RENDERERS = {
+    'csv': render_csv,
+    'ndjson': render_ndjson,
+}
+# StreamingHttpResponse buffers a sync iterator whole under ASGI, so ASGI requests get these
+ASYNC_RENDERERS = {
+    'csv': arender_csv,
+    'ndjson': arender_ndjson,
+}
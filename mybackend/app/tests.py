@@ -1,3 +1,559 @@
-from django.test import TestCase
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import services
+from .ledger import balance_at
+from .management.commands.check_query_plans import SEQ_SCAN_PATTERNS
+from .models import BalanceSnapshot, CustomUser, IdempotencyKey, LedgerEntry, Transaction
+from .tokens import AccountRefreshToken
+
+
+def create_account(email, **fields):
+    fields.setdefault('status', CustomUser.AccountStatus.APPROVED)
+    return CustomUser.objects.create_user(email=email, username=email.split('@')[0], **fields)
+
+
+def api_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccountRefreshToken.for_user(user).access_token}')
+    return client
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs row-level locking (select_for_update)')
+class ConcurrentApprovalTests(TransactionTestCase):
+    approvals = 300
+    workers = 16
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            email='admin@example.com', username='admin', password='pass12345', is_staff=True,
+        )
+        self.account = CustomUser.objects.create_user(
+            email='holder@example.com', username='holder', password='pass12345',
+            status=CustomUser.AccountStatus.APPROVED,
+        )
+
+    def approve(self, pk):
+        try:
+            Transaction.objects.get(pk=pk).approve(self.admin)
+        finally:
+            connections.close_all()
+
+    def test_concurrent_deposits_into_one_account(self):
+        ids = [
+            Transaction.objects.create(user=self.account, transaction_type='deposit', amount=Decimal('1.25')).pk
+            for _ in range(self.approvals)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self.approve, ids))
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1.25') * self.approvals)
+        self.assertEqual(Transaction.objects.filter(pk__in=ids, status='approved').count(), self.approvals)
+
+
+class AdminChangelistQueryTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(
+            email='admin@example.com', username='admin', password='pass12345',
+        )
+        self.client.force_login(self.admin)
+
+    def create_users(self, count):
+        start = CustomUser.objects.count()
+        for i in range(start, start + count):
+            CustomUser.objects.create_user(email=f'user{i}@example.com', username=f'user{i}')
+
+    def create_transactions(self, count):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.admin, transaction_type='deposit', amount=10, processed_by=self.admin)
+            for _ in range(count)
+        ])
+
+    def assertConstantQueries(self, url, create):
+        create(5)
+        with CaptureQueriesContext(connection) as small_page:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        create(100)
+        # A full 100-row page must cost exactly what a 5-row page does
+        with self.assertNumQueries(len(small_page)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['cl'].result_list), 100)
+
+    def test_transaction_changelist(self):
+        self.assertConstantQueries(reverse('admin:app_transaction_changelist'), self.create_transactions)
+
+    def test_user_changelist(self):
+        self.assertConstantQueries(reverse('admin:app_customuser_changelist'), self.create_users)
+
+
+@skipUnless(connection.vendor in SEQ_SCAN_PATTERNS, 'No query plan check for this database')
+class QueryPlanTests(TestCase):
+    def test_hot_querysets_use_indexes(self):
+        # Raises CommandError naming the querysets that fell back to a sequential scan
+        call_command('check_query_plans', stdout=StringIO())
+
+
+@override_settings(QUERY_METRICS_ENABLED=True, QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Every budgeted endpoint, with QueryMetricsMiddleware raising on an overrun."""
+
+    def setUp(self):
+        cache.clear()
+        # Only the per-request log lines; an overrun raises QueryBudgetExceeded
+        queries_logger = logging.getLogger('app.queries')
+        self.addCleanup(queries_logger.setLevel, queries_logger.level)
+        queries_logger.setLevel(logging.WARNING)
+        self.user = create_account('budget@example.com', balance=Decimal('500.00'))
+        self.recipient = create_account('recipient@example.com')
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, transaction_type='deposit', amount=10) for _ in range(30)
+        ])
+        self.client = api_client(self.user)
+
+    def assertWithinBudget(self, response, status_code=200):
+        self.assertEqual(response.status_code, status_code)
+        self.assertIn('Server-Timing', response)
+
+    def test_reads(self):
+        for name in ('profile', 'transaction-list', 'dashboard'):
+            with self.subTest(name):
+                self.assertWithinBudget(self.client.get(reverse(name)))
+        self.assertWithinBudget(self.client.get(reverse('transaction-list'), {'page_size': 10}))
+
+    def test_statement(self):
+        response = self.client.get(reverse('statement-export'))
+        self.assertWithinBudget(response)
+        self.assertEqual(b''.join(response.streaming_content).count(b'\n'), 31)
+
+    def test_writes(self):
+        transfer = {'amount': '5.00', 'recipient_account_number': self.recipient.account_number}
+        requests = [
+            ('deposit', {'amount': '25.00', 'description': 'budget'}),
+            ('transfer', transfer),
+            ('transfer-batch', {'transfers': [transfer, transfer, transfer]}),
+        ]
+        for name, data in requests:
+            with self.subTest(name):
+                self.assertWithinBudget(self.client.post(reverse(name), data, format='json'), 201)
+                # The Idempotency-Key path records the response as well
+                response = self.client.post(reverse(name), data, format='json', HTTP_IDEMPOTENCY_KEY=f'budget-{name}')
+                self.assertWithinBudget(response, 201)
+
+
+class ApproveTransactionsTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(email='admin@example.com', username='admin', password=None)
+        self.sender = create_account('sender@example.com', balance=Decimal('100.00'))
+        self.recipient = create_account('recipient@example.com')
+
+    def create(self, transaction_type, amount, user=None, **fields):
+        if transaction_type == 'transfer':
+            fields.setdefault('recipient_email', self.recipient.email)
+        return Transaction.objects.create(
+            user=user or self.sender, transaction_type=transaction_type, amount=Decimal(amount), **fields
+        )
+
+    def test_mixed_batch(self):
+        batch = [
+            self.create('deposit', '50.00'),
+            self.create('loan', '30.00'),
+            self.create('transfer', '120.00'),
+            self.create('deposit', '5.00', user=self.recipient),
+        ]
+
+        approved, errors = services.approve_transactions(batch, self.admin)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(approved), 4)
+        self.sender.refresh_from_db()
+        self.recipient.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal('60.00'))
+        self.assertEqual(self.sender.loan_balance, Decimal('30.00'))
+        self.assertEqual(self.recipient.balance, Decimal('125.00'))
+        for txn in Transaction.objects.filter(pk__in=[t.pk for t in batch]):
+            self.assertEqual((txn.status, txn.processed_by_id), ('approved', self.admin.pk))
+            self.assertIsNotNone(txn.processed_at)
+        self.assertEqual(Transaction.objects.get(pk=batch[1].pk).loan_balance, Decimal('30.00'))
+
+        counterpart = Transaction.objects.get(user=self.recipient, transaction_type='transfer')
+        self.assertEqual(counterpart.amount, Decimal('120.00'))
+        self.assertEqual(counterpart.status, 'approved')
+        self.assertEqual(counterpart.recipient_email, self.sender.email)
+        self.assertEqual(counterpart.processed_by, self.admin)
+
+    def test_insufficient_balance_stays_pending(self):
+        deposit = self.create('deposit', '10.00')
+        transfer = self.create('transfer', '500.00')
+        missing = self.create('transfer', '1.00', recipient_email='nobody@example.com')
+
+        approved, errors = services.approve_transactions([deposit, transfer, missing], self.admin)
+
+        self.assertEqual([t.pk for t in approved], [deposit.pk])
+        self.assertEqual(
+            {(t.pk, message) for t, message in errors},
+            {(transfer.pk, 'Insufficient balance'), (missing.pk, 'Recipient does not exist')},
+        )
+        transfer.refresh_from_db()
+        self.assertEqual((transfer.status, transfer.processed_at, transfer.processed_by), ('pending', None, None))
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal('110.00'))
+        self.assertFalse(Transaction.objects.filter(user=self.recipient).exists())
+
+    def test_transfers_applied_oldest_first(self):
+        newer = self.create('transfer', '80.00')
+        older = self.create('transfer', '60.00')
+        Transaction.objects.filter(pk=older.pk).update(created_at=newer.created_at - timedelta(minutes=5))
+
+        # Passed newest first; only one of them fits in the balance
+        approved, errors = services.approve_transactions([newer, older], self.admin)
+
+        self.assertEqual([t.pk for t in approved], [older.pk])
+        self.assertEqual([(t.pk, message) for t, message in errors], [(newer.pk, 'Insufficient balance')])
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal('40.00'))
+
+    def approval_queries(self, count):
+        batch = []
+        for index in range(count):
+            batch.append(self.create(('deposit', 'loan', 'transfer')[index % 3], '1.00'))
+        with CaptureQueriesContext(connection) as captured:
+            approved, errors = services.approve_transactions(batch, self.admin)
+        self.assertEqual((len(approved), errors), (count, []))
+        return len(captured)
+
+    def test_constant_query_count(self):
+        self.assertEqual(self.approval_queries(6), self.approval_queries(90))
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(email='admin@example.com', username='admin', password=None)
+        self.user = create_account('holder@example.com')
+        self.recipient = create_account('recipient@example.com')
+
+    def post(self, amount, minutes_ago, account='balance'):
+        return LedgerEntry.objects.create(
+            user=self.user, account=account, amount=Decimal(amount),
+            created_at=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+
+    def test_legs_sum_to_zero(self):
+        for transaction_type in ('deposit', 'transfer', 'loan'):
+            with self.subTest(transaction_type):
+                txn = Transaction.objects.create(
+                    user=self.user, transaction_type=transaction_type, amount=Decimal('12.50'),
+                    recipient_email=self.recipient.email,
+                )
+                if transaction_type == 'transfer':
+                    CustomUser.objects.filter(pk=self.user.pk).update(balance=Decimal('100.00'))
+                txn.approve(self.admin)
+                legs = LedgerEntry.objects.filter(transaction=txn)
+                self.assertEqual(legs.count(), 2)
+                self.assertEqual(sum(leg.amount for leg in legs), 0)
+
+    def test_approval_service_legs_sum_to_zero(self):
+        batch = [
+            Transaction.objects.create(user=self.user, transaction_type=transaction_type, amount=Decimal('7.00'),
+                                       recipient_email=self.recipient.email)
+            for transaction_type in ('deposit', 'loan', 'transfer')
+        ]
+        approved, errors = services.approve_transactions(batch, self.admin)
+        self.assertEqual((len(approved), errors), (3, []))
+        for txn in batch:
+            self.assertEqual(sum(LedgerEntry.objects.filter(transaction=txn).values_list('amount', flat=True)), 0)
+
+    def test_balance_at_without_snapshot(self):
+        self.post('100.00', 60)
+        self.post('-30.00', 30)
+        self.post('-20.00', 30, account='loan')
+        self.post('5.00', 1)
+
+        self.assertEqual(balance_at(self.user, timezone.now() - timedelta(minutes=90)), (0, 0))
+        self.assertEqual(balance_at(self.user, timezone.now() - timedelta(minutes=10)), (Decimal('70.00'), Decimal('20.00')))
+        self.assertEqual(balance_at(self.user, timezone.now()), (Decimal('75.00'), Decimal('20.00')))
+
+    def test_balance_at_with_snapshot(self):
+        self.post('100.00', 60)
+        # Deliberately different from the entries before it, to show those are not re-summed
+        BalanceSnapshot.objects.create(
+            user=self.user, taken_at=timezone.now() - timedelta(minutes=45),
+            balance=Decimal('500.00'), loan_balance=Decimal('50.00'),
+        )
+        self.post('-30.00', 30)
+        self.post('-10.00', 30, account='loan')
+
+        self.assertEqual(balance_at(self.user, timezone.now() - timedelta(minutes=40)), (Decimal('500.00'), Decimal('50.00')))
+        self.assertEqual(balance_at(self.user, timezone.now()), (Decimal('470.00'), Decimal('60.00')))
+        self.assertEqual(balance_at(self.user, timezone.now() - timedelta(minutes=50)), (Decimal('100.00'), 0))
+
+    def test_snapshot_balances_lag(self):
+        self.post('100.00', 120)
+        self.post('25.00', 0)
+
+        call_command('snapshot_balances', '--lag', '60', stdout=StringIO())
+        snapshot = BalanceSnapshot.objects.get(user=self.user)
+        # The entry inside the lag window is left for the next run
+        self.assertEqual(snapshot.balance, Decimal('100.00'))
+        self.assertLess(snapshot.taken_at, timezone.now() - timedelta(seconds=59))
+
+        call_command('snapshot_balances', '--lag', '0', stdout=StringIO())
+        self.assertEqual(BalanceSnapshot.objects.filter(user=self.user).first().balance, Decimal('125.00'))
+
+    def test_reconcile_ledger(self):
+        txn = Transaction.objects.create(user=self.user, transaction_type='loan', amount=Decimal('40.00'))
+        txn.approve(self.admin)
+        call_command('reconcile_ledger', stdout=StringIO())
+
+        CustomUser.objects.filter(pk=self.user.pk).update(balance=Decimal('41.00'))
+        output = StringIO()
+        with self.assertRaisesMessage(CommandError, '1 of 3 accounts do not match the ledger'):
+            call_command('reconcile_ledger', stdout=output)
+        self.assertIn('holder@example.com', output.getvalue())
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_account('idempotent@example.com')
+        self.client = api_client(self.user)
+        self.url = reverse('deposit')
+
+    def deposit(self, amount, key='deposit-1'):
+        return self.client.post(self.url, {'amount': amount}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response(self):
+        first = self.deposit('25.00')
+        replay = self.deposit('25.00')
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_different_payload_is_rejected(self):
+        self.deposit('25.00')
+        response = self.deposit('30.00')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_failed_response_is_not_stored(self):
+        self.assertEqual(self.deposit('lots').status_code, 400)
+        self.assertEqual(self.deposit('25.00').status_code, 201)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_expired_key_is_replaced(self):
+        self.deposit('25.00')
+        IdempotencyKey.objects.filter(user=self.user).update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.deposit('30.00')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(IdempotencyKey.objects.get(user=self.user).response_body, response.json())
+
+
+@override_settings(RATE_LIMITS={'deposit': {'ip': '60/min', 'account': '2/min'}})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_account('limited@example.com')
+        self.client = api_client(self.user)
+
+    def deposit(self, client=None):
+        return (client or self.client).post(reverse('deposit'), {'amount': '5.00'}, format='json')
+
+    def test_burst_then_retry_after(self):
+        self.assertEqual(self.deposit().status_code, 201)
+        self.assertEqual(self.deposit().status_code, 201)
+        response = self.deposit()
+        self.assertEqual(response.status_code, 429)
+        # One token comes back every 30 seconds
+        self.assertIn(int(response['Retry-After']), range(1, 31))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    def test_buckets_are_per_account(self):
+        self.deposit()
+        self.deposit()
+        other = create_account('other@example.com')
+        self.assertEqual(self.deposit(api_client(other)).status_code, 201)
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(3):
+            self.assertEqual(self.deposit().status_code, 201)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_account('conditional@example.com')
+        self.client = api_client(self.user)
+
+    def assertRevalidates(self, url, write):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # The cached user and dashboard are dropped once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_profile(self):
+        url = reverse('profile')
+        response = self.assertRevalidates(
+            url, lambda: self.client.patch(url, {'first_name': 'Changed'}, format='json'),
+        )
+        self.assertEqual(response.json()['first_name'], 'Changed')
+
+    def test_transaction_list(self):
+        Transaction.objects.create(user=self.user, transaction_type='deposit', amount=10)
+        response = self.assertRevalidates(
+            reverse('transaction-list'),
+            lambda: self.client.post(reverse('deposit'), {'amount': '5.00'}, format='json'),
+        )
+        self.assertEqual(len(response.json()), 2)
+
+    def test_query_string_changes_etag(self):
+        url = reverse('transaction-list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, {'page_size': 10}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = create_account('pages@example.com')
+        self.client = api_client(self.user)
+        now = timezone.now()
+        transactions = Transaction.objects.bulk_create([
+            Transaction(user=self.user, transaction_type='deposit', amount=i + 1) for i in range(25)
+        ])
+        # Pairs share a created_at, so the id tie-break decides their order
+        for i, transaction in enumerate(transactions):
+            transaction.created_at = now - timedelta(minutes=i // 2)
+        Transaction.objects.bulk_update(transactions, ['created_at'])
+        self.expected = [t.pk for t in sorted(transactions, key=lambda t: (t.created_at, t.pk), reverse=True)]
+
+    def walk(self, insert_between_pages=False):
+        ids = []
+        url = reverse('transaction-list') + '?page_size=10'
+        while url:
+            body = self.client.get(url).json()
+            ids.extend(row['id'] for row in body['results'])
+            url = body['next']
+            if insert_between_pages:
+                Transaction.objects.create(user=self.user, transaction_type='deposit', amount=99)
+        return ids
+
+    def test_pages_cover_every_row_once(self):
+        self.assertEqual(self.walk(), self.expected)
+
+    def test_pages_are_stable_across_inserts(self):
+        # Newer rows land before the cursor and never shift or repeat later pages
+        self.assertEqual(self.walk(insert_between_pages=True), self.expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('transaction-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_plain_list_without_pagination_params(self):
+        self.assertEqual(len(self.client.get(reverse('transaction-list')).json()), 25)
+
+
+class BulkTransferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_account('sender@example.com', balance=Decimal('100.00'))
+        self.recipient = create_account('recipient@example.com')
+        self.client = api_client(self.user)
+
+    def transfer(self, amount, account_number=None):
+        return {'amount': amount, 'recipient_account_number': account_number or self.recipient.account_number}
+
+    def post(self, transfers):
+        return self.client.post(reverse('transfer-batch'), {'transfers': transfers}, format='json')
+
+    def test_creates_pending_transfers(self):
+        response = self.post([self.transfer('10.00'), self.transfer('20.00')])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['transactions']), 2)
+        self.assertEqual(
+            Transaction.objects.filter(user=self.user, recipient=self.recipient, status='pending').count(), 2,
+        )
+
+    def test_errors_are_keyed_by_item(self):
+        response = self.post([
+            self.transfer('10.00'),
+            self.transfer('10.00', '0000000000'),
+            self.transfer('10.00', self.user.account_number),
+            self.transfer('10.00'),
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['transfers']
+        self.assertEqual(sorted(errors), ['1', '2'])
+        self.assertEqual(errors['1']['recipient_account_number'], ['Recipient account number does not exist.'])
+        self.assertEqual(errors['2']['recipient_account_number'], ['Cannot transfer to your own account.'])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_field_errors_are_per_item(self):
+        response = self.post([self.transfer('10.00'), self.transfer('-1.00')])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['transfers'], {'1': {'amount': ['Amount must be greater than zero.']}})
+
+    def test_total_over_balance(self):
+        response = self.post([self.transfer('60.00'), self.transfer('60.00')])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+
+
+class ProcessTransactionsTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(email='admin@example.com', username='admin', password=None)
+        self.account = create_account('queued@example.com')
+
+    def test_refuses_process_local_backends(self):
+        with self.assertRaisesMessage(CommandError, 'CACHE_BACKEND must be a cache shared') as raised:
+            call_command('process_transactions', '--once', stdout=StringIO())
+        self.assertIn('EVENTS_BACKEND must publish across processes', str(raised.exception))
+
+    @override_settings(EVENTS_BACKEND='app.events.RedisBackend')
+    def test_refuses_locmem_cache(self):
+        with self.assertRaisesMessage(CommandError, 'CACHE_BACKEND must be a cache shared'):
+            call_command('process_transactions', '--once', stdout=StringIO())
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        EVENTS_BACKEND='app.events.RedisBackend',
+    )
+    def test_drains_queue_with_shared_backends(self):
+        transaction = Transaction.objects.create(
+            user=self.account, transaction_type='deposit', amount=Decimal('15.00'),
+            queued_at=timezone.now(), queued_by=self.admin,
+        )
+        # Approvals publish on commit, which never happens inside this test case
+        call_command('process_transactions', '--once', stdout=StringIO(), stderr=StringIO())
+        transaction.refresh_from_db()
+        self.account.refresh_from_db()
+        self.assertEqual(transaction.status, 'approved')
+        self.assertEqual(self.account.balance, Decimal('15.00'))
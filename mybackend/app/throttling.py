@@ -0,0 +1,113 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def parse_rate(rate):
+    """``'10/min'`` -> ``(10, 60)``: a bucket of 10 tokens refilled over 60 seconds."""
+    capacity, period = rate.split('/')
+    return int(capacity), PERIODS[period]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket keyed by ``scope`` (set on the view as ``throttle_scope``)
+    and whatever ``get_bucket_ident`` returns, with rates taken from
+    ``RATE_LIMITS[scope][kind]``.
+
+    The bucket is stored as a single integer in the cache: the time in
+    milliseconds at which it will be full again (the GCRA formulation of a
+    token bucket). Taking a token is one atomic ``cache.incr``, so a request
+    that is let through usually costs a single cache round trip.
+    """
+    kind = None
+
+    def get_bucket_ident(self, request, view):
+        raise NotImplementedError('.get_bucket_ident() must be overridden')
+
+    def get_rate(self, view):
+        scope = getattr(view, 'throttle_scope', None)
+        return getattr(settings, 'RATE_LIMITS', {}).get(scope, {}).get(self.kind)
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+            return True
+        rate = self.get_rate(view)
+        if rate is None:
+            return True
+        ident = self.get_bucket_ident(request, view)
+        if ident is None:
+            return True
+
+        capacity, period = parse_rate(rate)
+        interval = max(1, period * 1000 // capacity)
+        key = f'ratelimit:{view.throttle_scope}:{self.kind}:{ident}'
+        timeout = period + 1
+        now = int(time.time() * 1000)
+
+        if cache.add(key, now + interval, timeout):
+            return True
+        try:
+            full_at = cache.incr(key, interval)
+        except ValueError:
+            # Expired between add() and incr(): the bucket is full again
+            cache.set(key, now + interval, timeout)
+            return True
+
+        if full_at < now + interval:
+            # The bucket had refilled completely; restart it from now. Racing
+            # requests may overwrite each other here, which only errs on the
+            # side of letting a request through.
+            cache.set(key, now + interval, timeout)
+            return True
+        if full_at - now <= capacity * interval:
+            if full_at - now > capacity * interval // 2:
+                # Mostly drained: make sure the entry outlives the debt it records
+                cache.touch(key, timeout)
+            return True
+
+        # Give the token back and keep the entry alive while it is being hammered
+        cache.decr(key, interval)
+        cache.touch(key, timeout)
+        self.wait_seconds = (full_at - capacity * interval - now) / 1000
+        return False
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPRateThrottle(TokenBucketThrottle):
+    kind = 'ip'
+
+    def get_bucket_ident(self, request, view):
+        return self.get_ident(request)
+
+
+class AccountRateThrottle(TokenBucketThrottle):
+    """Keyed by the authenticated user, or by the submitted email on login."""
+    kind = 'account'
+
+    def get_bucket_ident(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+class EndpointRateThrottle(TokenBucketThrottle):
+    """One bucket shared by every caller of the endpoint."""
+    kind = 'endpoint'
+
+    def get_bucket_ident(self, request, view):
+        return 'all'
+
+
+RATE_LIMIT_THROTTLES = [IPRateThrottle, AccountRateThrottle, EndpointRateThrottle]
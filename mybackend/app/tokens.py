@@ -0,0 +1,12 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class AccountRefreshToken(RefreshToken):
+    """Refresh token whose access tokens also carry the account status and token version."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['status'] = user.status
+        token['token_version'] = user.token_version
+        return token
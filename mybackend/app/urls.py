@@ -4,11 +4,21 @@ from .views import (
     UserRegistrationView, 
     UserLoginView, 
     UserProfileView,
+    DashboardView,
     TransactionListView,
     TransactionDetailView,
+    StatementExportView,
+    TransactionEventsTicketView,
     DepositView,
     TransferView,
     LoanView,
+    BulkTransferView,
+)
+from .async_views import (
+    AsyncUserProfileView,
+    AsyncTransactionListView,
+    AsyncTransactionDetailView,
+    TransactionEventsView,
 )
 
 urlpatterns = [
@@ -16,9 +26,18 @@ urlpatterns = [
     path('auth/login/', UserLoginView.as_view(), name='login'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/profile/', UserProfileView.as_view(), name='profile'),
+    path('auth/dashboard/', DashboardView.as_view(), name='dashboard'),
     path('auth/transactions/', TransactionListView.as_view(), name='transaction-list'),
     path('auth/transactions/<int:pk>/', TransactionDetailView.as_view(), name='transaction-detail'),
+    path('auth/transactions/events/ticket/', TransactionEventsTicketView.as_view(), name='transaction-events-ticket'),
+    path('auth/statement/', StatementExportView.as_view(), name='statement-export'),
     path('auth/deposit/', DepositView.as_view(), name='deposit'),
     path('auth/loan/', LoanView.as_view(), name='loan'),
     path('auth/transfer/', TransferView.as_view(), name='transfer'),
+    path('auth/transfer/batch/', BulkTransferView.as_view(), name='transfer-batch'),
+    # Async-native read endpoints for ASGI deployments
+    path('async/auth/profile/', AsyncUserProfileView.as_view(), name='async-profile'),
+    path('async/auth/transactions/', AsyncTransactionListView.as_view(), name='async-transaction-list'),
+    path('async/auth/transactions/<int:pk>/', AsyncTransactionDetailView.as_view(), name='async-transaction-detail'),
+    path('async/auth/transactions/events/', TransactionEventsView.as_view(), name='transaction-events'),
 ] 
\ No newline at end of file
@@ -1,20 +1,42 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Q, Sum
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
 from rest_framework import status, generics
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth import authenticate, get_user_model
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
     UserProfileSerializer,
     TransactionSerializer,
+    CompactTransactionSerializer,
     TransactionCreateSerializer,
     DepositSerializer,
     TransferSerializer, 
     LoanSerializer,
+    BulkTransferSerializer,
 )
 from .models import CustomUser, Transaction
+from .cache import DASHBOARD_CACHE_TIMEOUT, dashboard_cache_key
+from . import events, metrics, statements
+from .conditional import ConditionalGetMixin
+from .idempotency import IdempotencyMixin
+from .permissions import IsApprovedAccount
+from .throttling import RATE_LIMIT_THROTTLES
+from .tokens import AccountRefreshToken
+from .pagination import TransactionCursorPagination
 
 User = get_user_model()
 
@@ -23,16 +45,19 @@ User = get_user_model()
 class UserRegistrationView(generics.CreateAPIView):
     permission_classes = (AllowAny,)
     serializer_class = UserRegistrationSerializer
+    query_budget = 8
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
+            metrics.registrations.inc(outcome='success')
             return Response({
                 'status': 'success',
                 'message': 'Registration successful! Please login with your credentials.',
                 'redirect_to': '/login'
             }, status=status.HTTP_201_CREATED)
+        metrics.registrations.inc(outcome='invalid')
         return Response({
             'status': 'error',
             'message': 'Registration failed',
@@ -42,6 +67,9 @@ class UserRegistrationView(generics.CreateAPIView):
 class UserLoginView(generics.CreateAPIView):
     permission_classes = (AllowAny,)
     serializer_class = UserLoginSerializer
+    query_budget = 2
+    throttle_classes = RATE_LIMIT_THROTTLES
+    throttle_scope = 'login'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -58,25 +86,29 @@ class UserLoginView(generics.CreateAPIView):
         )
 
         if not user:
+            metrics.logins.inc(outcome='invalid_credentials')
             return Response({
                 'status': 'error',
                 'message': 'Invalid credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
         if user.status == CustomUser.AccountStatus.REJECTED:
+            metrics.logins.inc(outcome='rejected')
             return Response({
                 'status': 'error',
                 'message': 'Your account has been rejected. It will be deleted in 24 hours.'
             }, status=status.HTTP_403_FORBIDDEN)
         
         if user.status == CustomUser.AccountStatus.PENDING:
+            metrics.logins.inc(outcome='pending')
             return Response({
                 'status': 'error',
                 'message': 'Your account is pending admin approval. You will be notified once approved.'
             }, status=status.HTTP_403_FORBIDDEN)
         
         if user.status == CustomUser.AccountStatus.APPROVED:
-            refresh = RefreshToken.for_user(user)
+            refresh = AccountRefreshToken.for_user(user)
+            metrics.logins.inc(outcome='success')
             return Response({
                 'status': 'success',
                 'message': 'Login successful',
@@ -90,16 +122,69 @@ class UserLoginView(generics.CreateAPIView):
             'message': 'Account status is invalid'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    query_budget = 3
 
     def get_object(self):
         return self.request.user
 
-class TransactionListView(generics.ListCreateAPIView):
+    def get_last_modified(self, request):
+        return request.user.updated_at
+
+class DashboardView(generics.GenericAPIView):
+    """Profile, recent transactions and per-type totals in one cached response."""
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    query_budget = 4
+
+    def build_dashboard(self, user):
+        transactions = Transaction.objects.filter(user=user)
+        recent = transactions[:settings.DASHBOARD_RECENT_TRANSACTIONS]
+        totals = (
+            transactions.order_by()
+            .values('transaction_type')
+            .annotate(
+                count=Count('id'),
+                approved_amount=Sum('amount', filter=Q(status='approved'), default=0),
+                pending_amount=Sum('amount', filter=Q(status='pending'), default=0),
+            )
+        )
+        return {
+            'profile': UserProfileSerializer(user).data,
+            'balances': {
+                'balance': user.balance,
+                'loan_balance': user.loan_balance,
+            },
+            'recent_transactions': TransactionSerializer(recent, many=True).data,
+            'totals': {row.pop('transaction_type'): row for row in totals},
+        }
+
+    def get(self, request, *args, **kwargs):
+        key = dashboard_cache_key(request.user.pk)
+        cached = cache.get(key)
+        if cached is None:
+            payload = self.build_dashboard(request.user)
+            body = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True)
+            etag = '"%s"' % hashlib.md5(body.encode()).hexdigest()
+            cache.set(key, (etag, payload), DASHBOARD_CACHE_TIMEOUT)
+        else:
+            etag, payload = cached
+
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        # Weak comparison: CompressionMiddleware hands out W/ versions of the ETag
+        client_etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+        if etag in client_etags or '*' in client_etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(payload, headers=headers)
+
+class TransactionListView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = TransactionSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    pagination_class = TransactionCursorPagination
+    query_budget = 4
+    throttle_classes = RATE_LIMIT_THROTTLES
+    throttle_scope = 'deposit'
 
     def get_queryset(self):
         return Transaction.objects.filter(user=self.request.user)
@@ -109,38 +194,121 @@ class TransactionListView(generics.ListCreateAPIView):
             return DepositSerializer
         return TransactionSerializer
 
+    def get_last_modified(self, request):
+        # Rows are only ever added (created_at) or processed (processed_at);
+        # both maxima come straight off the (user, ...) indexes
+        latest = self.get_queryset().aggregate(created=Max('created_at'), processed=Max('processed_at'))
+        return max(filter(None, latest.values()), default=None)
+
+    def list(self, request, *args, **kwargs):
+        if not CompactTransactionSerializer.requested(request):
+            return super().list(request, *args, **kwargs)
+        rows = CompactTransactionSerializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(CompactTransactionSerializer(page).data)
+        return Response(CompactTransactionSerializer(rows).data)
+
+    def get_throttles(self):
+        # Creating here is a deposit, so it shares the deposit buckets; reads are not limited
+        if self.request.method == 'POST':
+            return super().get_throttles()
+        return []
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        transaction = serializer.save(user=self.request.user)
+        metrics.transactions_created.inc(type=transaction.transaction_type)
 
 class TransactionDetailView(generics.RetrieveAPIView):
     serializer_class = TransactionSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    query_budget = 2
 
     def get_queryset(self):
         return Transaction.objects.filter(user=self.request.user)
 
-class DepositView(generics.CreateAPIView):
+class TransactionEventsTicketView(generics.GenericAPIView):
+    """Trades the access token for a short-lived ticket to open the transaction event stream with."""
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    query_budget = 1
+
+    def post(self, request, *args, **kwargs):
+        claims = {
+            claim: request.auth[claim]
+            for claim in (jwt_settings.USER_ID_CLAIM, 'exp', 'status', 'token_version')
+            if claim in request.auth
+        }
+        return Response({
+            'ticket': events.issue_ticket(claims),
+            'expires_in': settings.SSE_TICKET_MAX_AGE,
+        })
+
+class StatementExportView(generics.GenericAPIView):
+    """Streams the user's transactions as CSV or NDJSON without loading them all."""
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    query_budget = 2
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in statements.RENDERERS:
+            return Response({
+                'status': 'error',
+                'message': f"Unsupported file_format, choose one of: {', '.join(statements.RENDERERS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        dates = {}
+        for name in ('start', 'end'):
+            value = request.query_params.get(name)
+            try:
+                dates[name] = parse_date(value) if value else None
+            except ValueError:
+                dates[name] = None
+            if value and dates[name] is None:
+                return Response({
+                    'status': 'error',
+                    'message': f"{name} must be a date in YYYY-MM-DD format"
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        if isinstance(request._request, ASGIRequest):
+            rows = statements.astatement_rows(request.user, dates['start'], dates['end'])
+            content = statements.ASYNC_RENDERERS[file_format](rows)
+        else:
+            rows = statements.statement_rows(request.user, dates['start'], dates['end'])
+            content = statements.RENDERERS[file_format](rows)
+        response = StreamingHttpResponse(content, content_type=statements.CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="statement-{request.user.account_number}.{file_format}"'
+        return response
+
+class DepositView(IdempotencyMixin, generics.CreateAPIView):
     serializer_class = DepositSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    query_budget = 6
+    throttle_classes = RATE_LIMIT_THROTTLES
+    throttle_scope = 'deposit'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
+        metrics.transactions_created.inc(type=serializer.instance.transaction_type)
         headers = self.get_success_headers(serializer.data)
         return Response({
             'status': 'success',
             'message': 'Deposit request submitted successfully. Waiting for admin approval.',
             'transaction': serializer.data
         }, status=status.HTTP_201_CREATED, headers=headers)
-class LoanView(generics.CreateAPIView):
+class LoanView(IdempotencyMixin, generics.CreateAPIView):
     serializer_class = LoanSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    query_budget = 6
+    throttle_classes = RATE_LIMIT_THROTTLES
+    throttle_scope = 'loan'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
+        metrics.transactions_created.inc(type=serializer.instance.transaction_type)
         headers = self.get_success_headers(serializer.data)
         return Response({
             'status': 'success',
@@ -148,15 +316,50 @@ class LoanView(generics.CreateAPIView):
             'transaction': serializer.data
         }, status=status.HTTP_201_CREATED, headers=headers)
 
-class TransferView(generics.CreateAPIView):
+class TransferView(IdempotencyMixin, generics.CreateAPIView):
     serializer_class = TransferSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    query_budget = 7
+    throttle_classes = RATE_LIMIT_THROTTLES
+    throttle_scope = 'transfer'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         transaction = serializer.save()
+        metrics.transactions_created.inc(type=transaction.transaction_type)
         return Response({
             'message': 'Transfer request submitted and pending admin approval.',
             'transaction': TransactionSerializer(transaction).data
         }, status=status.HTTP_201_CREATED)
+
+class BulkTransferView(IdempotencyMixin, generics.CreateAPIView):
+    serializer_class = BulkTransferSerializer
+    permission_classes = [IsAuthenticated, IsApprovedAccount]
+    query_budget = 7
+    throttle_classes = RATE_LIMIT_THROTTLES
+    throttle_scope = 'bulk-transfer'
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # bulk_create inserts every row inside a single database transaction
+        transactions = serializer.save()
+        metrics.transactions_created.inc(len(transactions), type='transfer')
+        return Response({
+            'message': f'{len(transactions)} transfer requests submitted and pending admin approval.',
+            'transactions': TransactionSerializer(transactions, many=True).data
+        }, status=status.HTTP_201_CREATED)
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition, behind ``Authorization: Bearer <METRICS_TOKEN>``.
+    Without a METRICS_TOKEN the endpoint does not exist (404).
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        raise Http404()
+    if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,6 +2,9 @@
 ASGI config for mybackend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The Procfile serves it with
+``gunicorn mybackend.asgi:application -k uvicorn_worker.UvicornWorker``,
+so the read endpoints under ``/api/async/`` run on the event loop.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
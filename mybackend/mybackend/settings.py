@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import dj_database_url
 import os
+from datetime import timedelta
 from pathlib import Path
 import os
 import dj_database_url
@@ -47,9 +48,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.RequestMetricsMiddleware',
+    'app.middleware.CompressionMiddleware',
+    'app.middleware.QueryMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'app.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,6 +62,33 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request query count/time reporting (Server-Timing header + 'app.queries' log)
+QUERY_METRICS_ENABLED = os.environ.get('QUERY_METRICS_ENABLED', 'False') == 'True'
+# Raise instead of logging when a view exceeds its query_budget (use in tests)
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False') == 'True'
+
+# /metrics is served only with METRICS_TOKEN set (404 otherwise) and requires
+# "Authorization: Bearer <METRICS_TOKEN>"; set it wherever Prometheus scrapes.
+# With several workers point METRICS_MULTIPROC_DIR at a shared directory so
+# every worker is reported
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '1.0'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'app': {
+            'handlers': ['console'],
+            'level': os.environ.get('APP_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 ROOT_URLCONF = 'mybackend.urls'
 
 TEMPLATES = [
@@ -85,6 +116,54 @@ DATABASES = {
 }
 
 
+# Cache
+# Per-process locmem by default; point CACHE_BACKEND/CACHE_LOCATION at a file,
+# memcached or redis cache when running several workers so invalidation is shared.
+# The process_transactions worker refuses to start against locmem.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 60))
+DASHBOARD_RECENT_TRANSACTIONS = 10
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 30))
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+BULK_TRANSFER_MAX_ITEMS = 1000
+ADMIN_REPORTS_CACHE_TIMEOUT = int(os.environ.get('ADMIN_REPORTS_CACHE_TIMEOUT', 60))
+
+# Responses below COMPRESSION_MIN_SIZE bytes are sent uncompressed; brotli is
+# used when the optional brotli package is installed and the client accepts it
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Pub/sub behind the transaction event stream (app/events.py). LocalBackend only
+# reaches subscribers in the same process; use app.events.RedisBackend with a
+# redis:// EVENTS_LOCATION when approvals run in another process (the
+# process_transactions worker refuses to start with LocalBackend).
+EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'app.events.LocalBackend')
+EVENTS_LOCATION = os.environ.get('EVENTS_LOCATION', '')
+SSE_HEARTBEAT_INTERVAL = 15
+# Lifetime of the single-use tickets EventSource clients open the stream with
+SSE_TICKET_MAX_AGE = 30
+# Events buffered per stream before a client that is not reading gets disconnected
+SSE_QUEUE_SIZE = 100
+
+# Token buckets per view throttle_scope, as 'burst/period' (see app/throttling.py).
+# Needs a cache shared by all workers (CACHE_BACKEND) to be enforced globally.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True') == 'True'
+RATE_LIMITS = {
+    'login': {'ip': '20/min', 'account': '5/min', 'endpoint': '100/s'},
+    'deposit': {'ip': '60/min', 'account': '10/min'},
+    'loan': {'ip': '60/min', 'account': '5/min'},
+    'transfer': {'ip': '60/min', 'account': '20/min'},
+    'bulk-transfer': {'ip': '20/min', 'account': '5/min'},
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -163,10 +242,11 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
 
 # Additional CORS settings for better compatibility
-CORS_EXPOSE_HEADERS = ['content-type', 'authorization']
+CORS_EXPOSE_HEADERS = ['content-type', 'authorization', 'etag', 'idempotent-replayed']
 CORS_PREFLIGHT_MAX_AGE = 86400
 
 # Security settings
@@ -178,7 +258,6 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
 # JWT settings
-from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -202,17 +281,21 @@ SIMPLE_JWT = {
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'app.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'app.renderers.FastJSONRenderer',
     ),
     'DEFAULT_PARSER_CLASSES': (
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.FormParser',
         'rest_framework.parsers.MultiPartParser'
     ),
+    # Reverse proxies in front of the app (Render's router is one). The client
+    # IP used by IPRateThrottle is taken that many hops from the right of
+    # X-Forwarded-For; 0 ignores the header and uses REMOTE_ADDR.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
 }
@@ -17,9 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from django.http import HttpResponse
+from app.views import metrics_view
 
 urlpatterns = [
     path('', lambda request: HttpResponse("Welcome to the Bank App API!")),
     path('admin/', admin.site.urls),
     path('api/', include('app.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]